@@ -0,0 +1,27 @@
+-- Bucket an Open-Meteo weathercode into a weather condition label.
+-- Shared by the enriched incidents model and the weather exposure rollup so
+-- incident counts and exposure hours use identical buckets.
+{% macro weather_condition(code) %}
+    case
+        when {{ code }} = 0 then 'Clear'
+        when {{ code }} in (1,2,3) then 'Cloudy'
+        when {{ code }} in (45,48) then 'Fog'
+        when {{ code }} in (51,53,55,56,57) then 'Rain/Drizzle'
+        when {{ code }} in (61,63,65,66,67) then 'Rain'
+        when {{ code }} in (71,73,75,77,85,86) then 'Snow'
+        when {{ code }} in (80,81,82) then 'Rain showers'
+        when {{ code }} in (95,96,99) then 'Thunderstorm'
+        else 'Other'
+    end
+{%- endmacro %}
+
+
+-- Project a lat/lon pair onto an approximate planar km grid (equirectangular
+-- around the point's own latitude) so that `<->` between two points is a
+-- distance in km and a GiST index can serve nearest-cell lookups.
+{% macro weather_cell_point(lat, lon) %}
+    point(
+        {{ lon }}::float8 * 111.320 * cos(radians({{ lat }}::float8)),
+        {{ lat }}::float8 * 110.574
+    )
+{%- endmacro %}
@@ -7,12 +7,10 @@ with stg as (
     from {{ ref('stg_tps_incidents') }}
 ),
 
--- Round coordinates for weather join and flag invalid coords
+-- Flag invalid coords (lat_r/lon_r for the weather join come from raw_incidents)
 prep as (
     select
         *,
-        round(lat::numeric, 2) as lat_r,
-        round(lon::numeric, 2) as lon_r,
 
         -- Flag invalid coordinates (true = problem)
         case
@@ -56,7 +54,7 @@ prep as (
     from stg
 ),
 
--- Attach weather
+-- Attach weather (exact cell/hour, else nearest cell/hour fallback)
 with_weather as (
     select
         p.*,
@@ -68,23 +66,20 @@ with_weather as (
         wc.cloudcover,
         wc.humidity,
         -- Create weather condition buckets based on OM codes
-        case
-            when wc.weathercode = 0 then 'Clear'
-            when wc.weathercode in (1,2,3) then 'Cloudy'
-            when wc.weathercode in (45,48) then 'Fog'
-            when wc.weathercode in (51,53,55,56,57) then 'Rain/Drizzle'
-            when wc.weathercode in (61,63,65,66,67) then 'Rain'
-            when wc.weathercode in (71,73,75,77,85,86) then 'Snow'
-            when wc.weathercode in (80,81,82) then 'Rain showers'
-            when wc.weathercode in (95,96,99) then 'Thunderstorm'
-            else 'Other'
-        end as weather_condition
+        {{ weather_condition('wc.weathercode') }} as weather_condition,
+
+        -- How the weather row was resolved (see int_incident_weather_match)
+        coalesce(m.weather_match_quality, 'unmatched') as weather_match_quality,
+        m.weather_match_distance_km,
+        m.weather_match_hour_offset
 
     from prep p
+    left join {{ ref('int_incident_weather_match') }} m
+        on m.event_id = p.event_id
     left join {{ source('src', 'weather_cache') }} wc
-        on wc.lat = p.lat_r
-       and wc.lon = p.lon_r
-       and wc.hour_utc = p.occ_date_utc
+        on wc.lat = m.weather_lat
+       and wc.lon = m.weather_lon
+       and wc.hour_utc = m.weather_hour_utc
 )
 
 select *
@@ -0,0 +1,136 @@
+{{ config(
+    materialized = 'table'
+) }}
+
+-- Resolve one weather_cache row per incident without extra API calls.
+--   1. exact:    same rounded cell, same hour (primary-key lookup)
+--   2. fallback: among the nearest fetched cells within the radius
+--                (GiST KNN on int_weather_cells), the row closest in time
+--                within +/- max hours; ties broken by distance.
+-- Incidents with no match are left out; int_enriched_incidents tags them
+-- 'unmatched'.
+
+{% set radius_km = var('weather_match_radius_km', 5) %}
+{% set max_hours = var('weather_match_max_hours', 2) %}
+{% set max_cells = var('weather_match_max_cells', 8) %}
+
+with incidents as (
+    select
+        event_id,
+        occ_date_utc,
+        lat_r,
+        lon_r
+    from {{ ref('stg_tps_incidents') }}
+    where lat_r is not null
+      and lon_r is not null
+),
+
+-- Exact cell + hour
+exact as (
+    select
+        i.event_id,
+        wc.lat,
+        wc.lon,
+        wc.hour_utc,
+        0::float8 as distance_km,
+        0::float8 as hour_offset
+    from incidents i
+    join {{ source('src', 'weather_cache') }} wc
+        on wc.lat = i.lat_r
+       and wc.lon = i.lon_r
+       and wc.hour_utc = i.occ_date_utc
+),
+
+-- Nearest cells within the radius whose coverage overlaps the time window
+candidate_cells as (
+    select
+        i.event_id,
+        i.occ_date_utc,
+        c.lat,
+        c.lon,
+        c.distance_km
+    from incidents i
+    left join exact e using (event_id)
+    cross join lateral (
+        select
+            cells.lat,
+            cells.lon,
+            cells.cell <-> {{ weather_cell_point('i.lat_r', 'i.lon_r') }} as distance_km
+        from {{ ref('int_weather_cells') }} cells
+        where cells.first_hour_utc <= i.occ_date_utc + interval '{{ max_hours }} hours'
+          and cells.last_hour_utc  >= i.occ_date_utc - interval '{{ max_hours }} hours'
+        order by cells.cell <-> {{ weather_cell_point('i.lat_r', 'i.lon_r') }}
+        limit {{ max_cells }}
+    ) c
+    where e.event_id is null
+      and c.distance_km <= {{ radius_km }}
+),
+
+-- Closest hour on either side of the incident in each candidate cell
+-- (two primary-key range probes per cell)
+candidate_hours as (
+    select
+        cc.event_id,
+        cc.lat,
+        cc.lon,
+        h.hour_utc,
+        cc.distance_km,
+        abs(extract(epoch from h.hour_utc - cc.occ_date_utc)) / 3600.0 as hour_offset
+    from candidate_cells cc
+    cross join lateral (
+        (
+            select wc.hour_utc
+            from {{ source('src', 'weather_cache') }} wc
+            where wc.lat = cc.lat
+              and wc.lon = cc.lon
+              and wc.hour_utc <= cc.occ_date_utc
+              and wc.hour_utc >= cc.occ_date_utc - interval '{{ max_hours }} hours'
+            order by wc.hour_utc desc
+            limit 1
+        )
+        union all
+        (
+            select wc.hour_utc
+            from {{ source('src', 'weather_cache') }} wc
+            where wc.lat = cc.lat
+              and wc.lon = cc.lon
+              and wc.hour_utc > cc.occ_date_utc
+              and wc.hour_utc <= cc.occ_date_utc + interval '{{ max_hours }} hours'
+            order by wc.hour_utc asc
+            limit 1
+        )
+    ) h
+),
+
+fallback as (
+    select distinct on (event_id)
+        event_id,
+        lat,
+        lon,
+        hour_utc,
+        distance_km,
+        hour_offset
+    from candidate_hours
+    order by event_id, hour_offset, distance_km
+),
+
+matched as (
+    select * from exact
+    union all
+    select * from fallback
+)
+
+select
+    event_id,
+    lat        as weather_lat,
+    lon        as weather_lon,
+    hour_utc   as weather_hour_utc,
+    round(distance_km::numeric, 3) as weather_match_distance_km,
+    hour_offset                    as weather_match_hour_offset,
+    case
+        when distance_km = 0 and hour_offset = 0 then 'exact'
+        when hour_offset = 0 then 'nearest_cell'
+        when distance_km = 0 then 'nearest_hour'
+        else 'nearest_cell_hour'
+    end as weather_match_quality
+from matched
@@ -0,0 +1,22 @@
+{{ config(
+    materialized = 'table',
+    indexes = [
+        {'columns': ['cell'], 'type': 'gist'}
+    ]
+) }}
+
+-- One row per fetched weather cell (rounded lat/lon) with its covered hour
+-- range. The GiST index on `cell` serves nearest-cell (KNN) lookups for
+-- int_incident_weather_match. It is declared through `indexes` so dbt creates
+-- it (with a unique name) on every rebuild; a fixed-name post_hook with
+-- "if not exists" would collide with the __dbt_backup table's index and skip.
+
+select
+    lat,
+    lon,
+    {{ weather_cell_point('lat', 'lon') }} as cell,
+    min(hour_utc)                          as first_hour_utc,
+    max(hour_utc)                          as last_hour_utc,
+    count(*)                               as hour_count
+from {{ source('src', 'weather_cache') }}
+group by lat, lon
@@ -0,0 +1,54 @@
+{{ config(
+    materialized = 'incremental',
+    unique_key = 'occ_date_day',
+    incremental_strategy = 'delete+insert'
+) }}
+
+-- Pre-aggregated daily rollup for dashboards.
+-- Grain: occ_date_day x neighbourhood_158 x weather_condition x collision_severity.
+-- Incremental runs rebuild whole days inside a trailing window so late TPS
+-- records and weather backfills are picked up; use --full-refresh after a
+-- backfill older than the window.
+
+{% set lookback_days = var('rollup_lookback_days', 14) %}
+
+with incidents as (
+    select *
+    from {{ ref('fct_incidents_flat') }}
+    where occ_date_day is not null
+    {% if is_incremental() %}
+      and occ_date_day >= (select max(occ_date_day) from {{ this }}) - interval '{{ lookback_days }} days'
+    {% endif %}
+)
+
+select
+    -- Grain
+    occ_date_day::date                                  as occ_date_day,
+    coalesce(neighbourhood_158, 'Unknown')              as neighbourhood_158,
+    weather_condition,
+    collision_severity,
+
+    -- Attributes (functionally dependent on the grain)
+    max(tps_hood_code)                                  as tps_hood_code,
+    min(collision_severity_rank)                        as collision_severity_rank,
+    bool_or(is_weekend)                                 as is_weekend,
+    max(season)                                         as season,
+
+    -- Measures
+    count(*)                                            as incident_count,
+    sum(fatalities)                                     as fatalities,
+    count(*) filter (where injury_collisions)           as injury_collisions,
+    count(*) filter (where ftr_collisions)              as ftr_collisions,
+    count(*) filter (where pd_collisions)               as pd_collisions,
+    count(*) filter (where automobile)                  as automobile_incidents,
+    count(*) filter (where motorcycle)                  as motorcycle_incidents,
+    count(*) filter (where passenger)                   as passenger_incidents,
+    count(*) filter (where bicycle)                     as bicycle_incidents,
+    count(*) filter (where pedestrian)                  as pedestrian_incidents,
+    count(*) filter (where weathercode is null)         as incidents_without_weather,
+    avg(temperature)                                    as avg_temperature,
+    avg(precipitation)                                  as avg_precipitation,
+    avg(snowfall)                                       as avg_snowfall
+
+from incidents
+group by 1, 2, 3, 4
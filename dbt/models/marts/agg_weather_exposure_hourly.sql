@@ -0,0 +1,44 @@
+{{ config(
+    materialized = 'incremental',
+    unique_key = 'date_utc',
+    incremental_strategy = 'delete+insert'
+) }}
+
+-- Hourly weather exposure: for each UTC hour, how many cached weather cells
+-- were under each weather condition. Summing exposure_share over hours gives
+-- city-wide hours of each condition, the denominator for incident rates
+-- (incidents per hour of Snow, Rain, ...).
+
+{% set lookback_days = var('rollup_lookback_days', 14) %}
+
+with weather as (
+    select
+        hour_utc,
+        date_utc,
+        lat,
+        lon,
+        {{ weather_condition('weathercode') }} as weather_condition
+    from {{ source('src', 'weather_cache') }}
+    {% if is_incremental() %}
+    where date_utc >= (select max(date_utc) from {{ this }}) - {{ lookback_days }}
+    {% endif %}
+),
+
+per_condition as (
+    select
+        hour_utc,
+        date_utc,
+        weather_condition,
+        count(*) as cell_count
+    from weather
+    group by 1, 2, 3
+)
+
+select
+    hour_utc,
+    date_utc,
+    weather_condition,
+    cell_count,
+    sum(cell_count) over (partition by hour_utc)                      as total_cells,
+    cell_count::numeric / sum(cell_count) over (partition by hour_utc) as exposure_share
+from per_condition
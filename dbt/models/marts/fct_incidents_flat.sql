@@ -58,6 +58,7 @@ with base as (
         windspeed,
         cloudcover,
         humidity,
+        weather_match_quality,
 
         -- Audit
         inserted_at
@@ -93,6 +93,8 @@ typed as (
         occ_date_utc,
         lat,
         lon,
+        lat_r,
+        lon_r,
         inserted_at
 
     from source
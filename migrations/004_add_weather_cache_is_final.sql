@@ -0,0 +1,21 @@
+-- Track whether a weather_cache row holds final archive values.
+-- Open-Meteo fills the most recent days of its archive with provisional
+-- values first; rows for those days are stored with is_final = false and
+-- refetched once, after the day has aged past the archive lag
+-- (WEATHER_ARCHIVE_LAG_DAYS in build_weather_cache.py, default 7).
+
+ALTER TABLE weather_cache
+    ADD COLUMN IF NOT EXISTS is_final BOOLEAN NOT NULL DEFAULT false;
+
+-- Backfill: anything older than the archive lag is treated as final.
+-- Rows fetched before this migration while still provisional can't be told
+-- apart; refetch suspect days with build_weather_cache force mode
+-- (--lat/--lon/--date), which overwrites rows even when is_final is set.
+UPDATE weather_cache
+SET is_final = true
+WHERE date_utc <= (now() AT TIME ZONE 'UTC')::date - 7;
+
+-- Small partial index: the refresh only ever scans provisional rows
+CREATE INDEX IF NOT EXISTS idx_weather_cache_provisional
+    ON weather_cache (lat, lon, date_utc)
+    WHERE NOT is_final;
@@ -0,0 +1,134 @@
+-- Range-partition raw_incidents by month of occ_date_utc and store rounded
+-- coordinates for the weather join.
+--
+-- * lat_r / lon_r are stored generated columns with the same type as
+--   weather_cache.lat / lon, so (lat_r, lon_r, occ_date_utc) lines up with
+--   the weather_cache primary key (lat, lon, hour_utc) and both sides can be
+--   joined through their indexes instead of a full hash join.
+-- * The primary key must include the partition key: it becomes
+--   (event_id, occ_date_utc) and occ_date_utc is NOT NULL. Every TPS feature
+--   carries OCC_DATE (the API query filters on it); ingest skips any that don't.
+--   The key alone no longer keeps event_id unique; migration 006 adds the
+--   raw_incident_keys table the ingest upsert uses to move revised events.
+-- * Monthly partitions are UTC months, created by ensure_raw_incidents_partition()
+--   (ingest calls it for every month it loads). A DEFAULT partition catches
+--   anything outside the created months.
+-- * Old months can be detached with detach_raw_incidents_before(); the
+--   detached tables stay in place for archiving or DROP.
+--
+-- The previous heap is kept as raw_incidents_unpartitioned; drop it once the
+-- row counts below match.
+
+BEGIN;
+
+ALTER TABLE raw_incidents RENAME TO raw_incidents_unpartitioned;
+ALTER TABLE raw_incidents_unpartitioned
+    RENAME CONSTRAINT raw_incidents_pkey TO raw_incidents_unpartitioned_pkey;
+ALTER INDEX idx_raw_incidents_occ_date_utc
+    RENAME TO idx_raw_incidents_unpartitioned_occ_date_utc;
+
+CREATE TABLE raw_incidents (
+    event_id     TEXT NOT NULL,                   -- e.g. "GO-xxxx", stable key
+    objectid     INTEGER,                         -- TPS internal record ID
+    raw          JSONB,                           -- full TPS payload for audit/fallback
+
+    -- Early extracted fields (for partitioning, joining, indexing)
+    occ_date_utc TIMESTAMPTZ NOT NULL,            -- UTC timestamp from TPS (partition key)
+    lat          NUMERIC(9,6),                    -- full precision latitude
+    lon          NUMERIC(9,6),                    -- full precision longitude
+
+    -- Rounded to the weather_cache grid (same type as weather_cache.lat/lon)
+    lat_r        NUMERIC(8,5) GENERATED ALWAYS AS (ROUND(lat, 2)) STORED,
+    lon_r        NUMERIC(8,5) GENERATED ALWAYS AS (ROUND(lon, 2)) STORED,
+
+    inserted_at  TIMESTAMPTZ DEFAULT now(),
+
+    PRIMARY KEY (event_id, occ_date_utc)
+) PARTITION BY RANGE (occ_date_utc);
+
+CREATE TABLE raw_incidents_default PARTITION OF raw_incidents DEFAULT;
+
+-- Indexes (created on every partition)
+-- 1. Time-based filtering
+CREATE INDEX IF NOT EXISTS idx_raw_incidents_occ_date_utc
+    ON raw_incidents (occ_date_utc);
+
+-- 2. Weather join key: matches weather_cache (lat, lon, hour_utc)
+CREATE INDEX IF NOT EXISTS idx_raw_incidents_weather_key
+    ON raw_incidents (lat_r, lon_r, occ_date_utc);
+
+
+-- Create the monthly partition holding `ts` (UTC month) if it doesn't exist.
+CREATE OR REPLACE FUNCTION ensure_raw_incidents_partition(ts TIMESTAMPTZ)
+RETURNS TEXT AS $$
+DECLARE
+    month_start TIMESTAMPTZ := date_trunc('month', ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    part_name   TEXT := 'raw_incidents_' || to_char(ts AT TIME ZONE 'UTC', '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass(part_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF raw_incidents FOR VALUES FROM (%L) TO (%L)',
+            part_name, month_start, month_start + interval '1 month'
+        );
+    END IF;
+    RETURN part_name;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Detach every monthly partition that ends on or before `cutoff`.
+-- Returns the detached table names.
+CREATE OR REPLACE FUNCTION detach_raw_incidents_before(cutoff DATE)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    part RECORD;
+BEGIN
+    FOR part IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'raw_incidents'::regclass
+          AND c.relname ~ '^raw_incidents_y[0-9]{4}m[0-9]{2}$'
+          AND to_date(right(c.relname, 8), '"y"YYYY"m"MM') + interval '1 month' <= cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE raw_incidents DETACH PARTITION %I', part.relname);
+        RETURN NEXT part.relname;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Partitions for existing history through three months ahead
+DO $$
+DECLARE
+    m TIMESTAMPTZ;
+BEGIN
+    FOR m IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE(MIN(occ_date_utc), now()) AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+            now() + interval '3 months',
+            interval '1 month'
+        )
+        FROM raw_incidents_unpartitioned
+    LOOP
+        PERFORM ensure_raw_incidents_partition(m);
+    END LOOP;
+END;
+$$;
+
+-- Copy history (rows without an occurrence date cannot be partitioned and
+-- stay in raw_incidents_unpartitioned)
+INSERT INTO raw_incidents (event_id, objectid, raw, occ_date_utc, lat, lon, inserted_at)
+SELECT event_id, objectid, raw, occ_date_utc, lat, lon, inserted_at
+FROM raw_incidents_unpartitioned
+WHERE occ_date_utc IS NOT NULL;
+
+ANALYZE raw_incidents;
+
+COMMIT;
+
+-- Verify before dropping the old heap:
+--   SELECT (SELECT count(*) FROM raw_incidents_unpartitioned WHERE occ_date_utc IS NOT NULL),
+--          (SELECT count(*) FROM raw_incidents);
+--   DROP TABLE raw_incidents_unpartitioned;
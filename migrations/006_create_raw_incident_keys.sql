@@ -0,0 +1,32 @@
+-- Keep event_id unique across raw_incidents partitions.
+--
+-- raw_incidents is keyed on (event_id, occ_date_utc) because occ_date_utc is
+-- its partition key. When TPS revises OCC_DATE/OCC_HOUR the event moves to a
+-- new occ_date_utc, and the old row has to go. Looking it up by event_id
+-- alone can't prune partitions, so this small unpartitioned table records
+-- each event's current occ_date_utc. The ingest upsert reads it, deletes the
+-- old row from exactly that partition, and updates the key, all in one
+-- statement (see UPSERT_RAW_INCIDENT_SQL in fetch_tps_incidents.py).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS raw_incident_keys (
+    event_id     TEXT PRIMARY KEY,                -- e.g. "GO-xxxx"
+    occ_date_utc TIMESTAMPTZ NOT NULL             -- where the event's row lives in raw_incidents
+);
+
+-- Backfill from the current rows (latest insert wins if an event was
+-- duplicated by an earlier revision)
+INSERT INTO raw_incident_keys (event_id, occ_date_utc)
+SELECT DISTINCT ON (event_id) event_id, occ_date_utc
+FROM raw_incidents
+ORDER BY event_id, inserted_at DESC
+ON CONFLICT (event_id) DO NOTHING;
+
+-- Drop the stale duplicates the backfill didn't pick
+DELETE FROM raw_incidents r
+USING raw_incident_keys k
+WHERE r.event_id = k.event_id
+  AND r.occ_date_utc <> k.occ_date_utc;
+
+COMMIT;
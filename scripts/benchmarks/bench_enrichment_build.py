@@ -0,0 +1,64 @@
+"""
+Time the dbt build of the weather enrichment chain (`+int_enriched_incidents`:
+stg_tps_incidents, int_weather_cells, int_incident_weather_match,
+int_enriched_incidents) on multi-year synthetic data.
+
+Before/after migration 005 (monthly partitions + stored lat_r/lon_r):
+
+  before: a database migrated through 004, and a checkout of the dbt project
+          from before the partitioning change (--project-dir)
+  after:  the current database and project
+
+The dbt sources pin `database: weather_accident_db`, so each side has to run
+on a database with that name: rename the other one out of the way
+(ALTER DATABASE ... RENAME TO ...) between the two runs.
+
+Each side is seeded the same way (see bench_rollups.seed) and built --runs
+times; per-model times come from dbt's run_results.json and the median per
+model is reported.
+
+Usage:
+  python -m scripts.benchmarks.bench_enrichment_build --seed --years 5 [--cleanup]
+  python -m scripts.benchmarks.bench_enrichment_build --seed --years 5 --project-dir <old checkout>/dbt
+"""
+import argparse
+import statistics
+
+from scripts.cli import DEFAULT_DBT_PROJECT_DIR
+from scripts.utils.config import getenv
+from scripts.utils.db_utils import get_db_conn
+from scripts.benchmarks.bench_rollups import seed, cleanup, dbt_run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dbt enrichment build.")
+    parser.add_argument("--seed", action="store_true", help="Load synthetic incidents and weather first")
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=150)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--project-dir", default=None, help="dbt project (default: DBT_PROJECT_DIR or ./dbt)")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic rows afterwards")
+    args = parser.parse_args()
+    project_dir = args.project_dir or getenv("DBT_PROJECT_DIR", DEFAULT_DBT_PROJECT_DIR)
+    dbt_args = ["--select", "+int_enriched_incidents"]
+
+    conn = get_db_conn()
+    try:
+        if args.seed:
+            seed(conn, args.years, args.per_day)
+
+        runs = [dbt_run(project_dir, f"build {i + 1}", dbt_args) for i in range(args.runs)]
+
+        print(f"median of {args.runs} runs:")
+        for model in runs[0]:
+            print(f"    {model:<30}{statistics.median(r[model] for r in runs):7.2f}s")
+        print(f"    {'total':<30}{statistics.median(sum(r.values()) for r in runs):7.2f}s")
+
+        if args.cleanup:
+            cleanup(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
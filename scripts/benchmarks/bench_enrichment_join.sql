@@ -0,0 +1,140 @@
+-- Benchmark the int_enriched_incidents weather join before/after
+-- migration 005 on synthetic multi-year data, in a scratch schema.
+--
+--   psql -d weather_accident_db -v years=5 -v per_day=150 \
+--        -f scripts/benchmarks/bench_enrichment_join.sql
+--
+-- "before": unpartitioned heap, join on round(lat::numeric, 2) etc.
+-- "after":  monthly partitions, join on stored lat_r/lon_r with the
+--           (lat_r, lon_r, occ_date_utc) index.
+-- Each side is timed as a CREATE TABLE AS, like the dbt table build.
+-- This isolates the join itself; bench_enrichment_build.py times the real
+-- dbt chain (+int_enriched_incidents, including the weather match model).
+
+\set ON_ERROR_STOP on
+\if :{?years}
+\else
+  \set years 5
+\endif
+\if :{?per_day}
+\else
+  \set per_day 150
+\endif
+
+DROP SCHEMA IF EXISTS bench CASCADE;
+CREATE SCHEMA bench;
+SET search_path = bench, public;
+SET TIME ZONE 'UTC';
+
+-- ========================
+-- Synthetic incidents
+-- ========================
+CREATE TABLE incidents_src AS
+SELECT
+    'GO-' || d::date || '-' || n                                        AS event_id,
+    d + make_interval(hours => (random() * 23)::int)                     AS occ_date_utc,
+    (43.60 + random() * 0.25)::numeric(9,6)                              AS lat,
+    (-79.60 + random() * 0.35)::numeric(9,6)                             AS lon
+FROM generate_series(
+         date_trunc('day', now()) - make_interval(years => :years),
+         date_trunc('day', now()) - interval '1 day',
+         interval '1 day') AS d,
+     generate_series(1, :per_day) AS n;
+
+-- Before: heap with a single occ_date_utc index
+CREATE TABLE raw_before (
+    event_id TEXT PRIMARY KEY, occ_date_utc TIMESTAMPTZ, lat NUMERIC(9,6), lon NUMERIC(9,6)
+);
+INSERT INTO raw_before SELECT * FROM incidents_src;
+CREATE INDEX ON raw_before (occ_date_utc);
+
+-- After: monthly partitions with stored rounded coordinates
+CREATE TABLE raw_after (
+    event_id TEXT NOT NULL, occ_date_utc TIMESTAMPTZ NOT NULL,
+    lat NUMERIC(9,6), lon NUMERIC(9,6),
+    lat_r NUMERIC(8,5) GENERATED ALWAYS AS (ROUND(lat, 2)) STORED,
+    lon_r NUMERIC(8,5) GENERATED ALWAYS AS (ROUND(lon, 2)) STORED,
+    PRIMARY KEY (event_id, occ_date_utc)
+) PARTITION BY RANGE (occ_date_utc);
+
+DO $$
+DECLARE
+    m TIMESTAMPTZ;
+BEGIN
+    FOR m IN
+        SELECT generate_series(date_trunc('month', MIN(occ_date_utc)), MAX(occ_date_utc), interval '1 month')
+        FROM bench.incidents_src
+    LOOP
+        EXECUTE format('CREATE TABLE bench.%I PARTITION OF bench.raw_after FOR VALUES FROM (%L) TO (%L)',
+                       'raw_after_' || to_char(m, 'YYYYMM'), m, m + interval '1 month');
+    END LOOP;
+END;
+$$;
+INSERT INTO raw_after (event_id, occ_date_utc, lat, lon) SELECT * FROM incidents_src;
+CREATE INDEX ON raw_after (occ_date_utc);
+CREATE INDEX ON raw_after (lat_r, lon_r, occ_date_utc);
+
+-- ========================
+-- Synthetic weather: every hour of every incident cell-day
+-- ========================
+CREATE TABLE weather (
+    lat NUMERIC(8,5) NOT NULL, lon NUMERIC(8,5) NOT NULL, hour_utc TIMESTAMPTZ NOT NULL,
+    temperature REAL, weathercode INTEGER,
+    PRIMARY KEY (lat, lon, hour_utc)
+);
+INSERT INTO weather
+SELECT cd.lat_r, cd.lon_r, cd.day + make_interval(hours => h), random() * 30 - 10, (random() * 3)::int
+FROM (
+    SELECT DISTINCT ROUND(lat, 2) AS lat_r, ROUND(lon, 2) AS lon_r, date_trunc('day', occ_date_utc) AS day
+    FROM incidents_src
+) cd
+CROSS JOIN generate_series(0, 23) AS h;
+
+ANALYZE raw_before;
+ANALYZE raw_after;
+ANALYZE weather;
+
+SELECT (SELECT count(*) FROM raw_before) AS incidents, (SELECT count(*) FROM weather) AS weather_rows;
+
+-- ========================
+-- Full build (dbt table materialization)
+-- ========================
+\timing on
+
+\echo 'before: full build'
+CREATE TABLE enriched_before AS
+SELECT p.*, w.temperature, w.weathercode
+FROM (SELECT *, round(lat::numeric, 2) AS lat_r, round(lon::numeric, 2) AS lon_r FROM raw_before) p
+LEFT JOIN weather w
+  ON w.lat = p.lat_r AND w.lon = p.lon_r AND w.hour_utc = p.occ_date_utc;
+
+\echo 'after: full build'
+CREATE TABLE enriched_after AS
+SELECT p.*, w.temperature, w.weathercode
+FROM raw_after p
+LEFT JOIN weather w
+  ON w.lat = p.lat_r AND w.lon = p.lon_r AND w.hour_utc = p.occ_date_utc;
+
+\timing off
+
+-- ========================
+-- Plans: one recent month (partition pruning + index join)
+-- ========================
+\echo 'before: last month'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT count(w.temperature)
+FROM (SELECT *, round(lat::numeric, 2) AS lat_r, round(lon::numeric, 2) AS lon_r FROM raw_before) p
+LEFT JOIN weather w
+  ON w.lat = p.lat_r AND w.lon = p.lon_r AND w.hour_utc = p.occ_date_utc
+WHERE p.occ_date_utc >= date_trunc('month', now()) - interval '1 month';
+
+\echo 'after: last month'
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF)
+SELECT count(w.temperature)
+FROM raw_after p
+LEFT JOIN weather w
+  ON w.lat = p.lat_r AND w.lon = p.lon_r AND w.hour_utc = p.occ_date_utc
+WHERE p.occ_date_utc >= date_trunc('month', now()) - interval '1 month';
+
+RESET search_path;
+-- DROP SCHEMA bench CASCADE;
@@ -0,0 +1,90 @@
+"""
+Compare peak memory and CPU time of the TPS response handling paths
+per 100k features:
+
+  old: response.json() -> json.dump(archive) -> json.dumps(feature) per row
+  new: raw bytes -> archive as-is -> iter_features (raw text reused for JSONB)
+
+Usage: python -m scripts.benchmarks.bench_json_parsing [--features N]
+"""
+import io
+import json
+import time
+import argparse
+import tracemalloc
+
+from scripts.fetch_tps_incidents import iter_features
+
+
+def make_body(n: int) -> bytes:
+    features = []
+    for i in range(n):
+        features.append({
+            "attributes": {
+                "OBJECTID": i,
+                "EVENT_UNIQUE_ID": f"GO-{i:011d}",
+                "OCC_DATE": 1704085200000,
+                "OCC_MONTH": "January",
+                "OCC_DOW": "Monday",
+                "OCC_YEAR": "2024",
+                "OCC_HOUR": str(i % 24),
+                "DIVISION": "D14",
+                "FATALITIES": 0,
+                "INJURY_COLLISIONS": "NO",
+                "FTR_COLLISIONS": "NO",
+                "PD_COLLISIONS": "YES",
+                "HOOD_158": "170",
+                "NEIGHBOURHOOD_158": "Yonge-Bay Corridor",
+                "LONG_WGS84": -79.38 + (i % 100) * 0.001,
+                "LAT_WGS84": 43.65 + (i % 100) * 0.001,
+                "AUTOMOBILE": "YES",
+                "MOTORCYCLE": "NO",
+                "PASSENGER": "NO",
+                "BICYCLE": "NO",
+                "PEDESTRIAN": "NO",
+            },
+            "geometry": {"x": -8836000.0 + i, "y": 5411000.0 + i},
+        })
+    return json.dumps({"objectIdFieldName": "OBJECTID", "features": features}).encode("utf-8")
+
+
+def old_path(body: bytes):
+    data = json.loads(body)
+    json.dump(data, io.StringIO())
+    for f in data["features"]:
+        json.dumps(f)
+
+
+def new_path(body: bytes):
+    io.BytesIO().write(body)
+    for f, raw in iter_features(body):
+        pass
+
+
+def measure(fn, body: bytes):
+    # Time and memory are measured in separate runs; tracemalloc slows CPU a lot
+    start = time.process_time()
+    fn(body)
+    cpu = time.process_time() - start
+
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TPS JSON handling.")
+    parser.add_argument("--features", type=int, default=100_000)
+    args = parser.parse_args()
+
+    body = make_body(args.features)
+    print(f"{args.features:,} features, body {len(body) / 1e6:.1f} MB")
+    for name, fn in [("old", old_path), ("new", new_path)]:
+        cpu, peak = measure(fn, body)
+        print(f"{name}: cpu {cpu:.2f}s, peak {peak / 1e6:.1f} MB (excluding body)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Time the dbt refresh of the rollup marts against fct_incidents_flat, and
+compare their Tableau export sizes.
+
+  flat:    dbt run --select +fct_incidents_flat (staging + intermediate + flat)
+  full:    dbt run --select agg_incidents_daily agg_weather_exposure_hourly --full-refresh
+  incr:    the same without --full-refresh (rebuilds rollup_lookback_days)
+  export:  export_table() for fct_incidents_flat and each rollup, to a temp dir
+
+Per-model times come from dbt's target/run_results.json, so dbt's own
+startup is excluded; wall time per dbt invocation is printed too.
+
+--seed loads synthetic incidents (event_id 'BENCH-...') and weather for
+every incident cell-day into the configured database first; --cleanup
+removes them afterwards. Runs against whatever the dbt profile targets.
+
+Usage: python -m scripts.benchmarks.bench_rollups [--seed] [--years N] [--per-day N] [--cleanup]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import warnings
+import subprocess
+
+from scripts.cli import DEFAULT_DBT_PROJECT_DIR
+from scripts.utils.config import getenv
+from scripts.utils.db_utils import get_db_conn
+from scripts.export_for_tableau import FLAT_TABLE, ROLLUP_TABLES, export_table
+
+ROLLUP_MODELS = ["agg_incidents_daily", "agg_weather_exposure_hourly"]
+
+# export_table() hands pandas a raw psycopg2 connection; the warning is noise here
+warnings.filterwarnings("ignore", message="pandas only supports SQLAlchemy")
+
+SEED_INCIDENTS_SQL = """
+    INSERT INTO raw_incidents (event_id, objectid, raw, occ_date_utc, lat, lon)
+    SELECT
+        'BENCH-' || to_char(d, 'YYYYMMDD') || '-' || n,
+        n,
+        jsonb_build_object('attributes', jsonb_build_object(
+            'EVENT_UNIQUE_ID', 'BENCH-' || to_char(d, 'YYYYMMDD') || '-' || n,
+            'OCC_DATE', (extract(epoch FROM d) * 1000)::bigint,
+            'OCC_HOUR', h,
+            'OCC_YEAR', extract(year FROM d)::int,
+            'OCC_MONTH', to_char(d, 'FMMonth'),
+            'OCC_DOW', to_char(d, 'FMDay'),
+            'DIVISION', 'D' || (11 + n %% 45),
+            'HOOD_158', (1 + n %% 158)::text,
+            'NEIGHBOURHOOD_158', 'Neighbourhood ' || (1 + n %% 158),
+            'FATALITIES', CASE WHEN n %% 997 = 0 THEN 1 ELSE 0 END,
+            'INJURY_COLLISIONS', CASE WHEN n %% 7 = 0 THEN 'YES' ELSE 'NO' END,
+            'FTR_COLLISIONS', CASE WHEN n %% 11 = 0 THEN 'YES' ELSE 'NO' END,
+            'PD_COLLISIONS', CASE WHEN n %% 7 <> 0 THEN 'YES' ELSE 'NO' END,
+            'AUTOMOBILE', 'YES',
+            'MOTORCYCLE', CASE WHEN n %% 23 = 0 THEN 'YES' ELSE 'NO' END,
+            'PASSENGER', CASE WHEN n %% 3 = 0 THEN 'YES' ELSE 'NO' END,
+            'BICYCLE', CASE WHEN n %% 29 = 0 THEN 'YES' ELSE 'NO' END,
+            'PEDESTRIAN', CASE WHEN n %% 17 = 0 THEN 'YES' ELSE 'NO' END,
+            'LAT_WGS84', lat,
+            'LONG_WGS84', lon
+        )),
+        d + make_interval(hours => h),
+        lat,
+        lon
+    FROM generate_series(
+             date_trunc('day', now() AT TIME ZONE 'UTC') - make_interval(years => %(years)s),
+             date_trunc('day', now() AT TIME ZONE 'UTC') - interval '1 day',
+             interval '1 day') AS d,
+         generate_series(1, %(per_day)s) AS n,
+         LATERAL (SELECT (n * 7 + extract(doy FROM d)::int) %% 24 AS h,
+                         round((43.60 + random() * 0.25)::numeric, 6) AS lat,
+                         round((-79.60 + random() * 0.35)::numeric, 6) AS lon) AS r
+"""
+
+# Every hour of every cell-day that has a synthetic incident
+SEED_WEATHER_SQL = """
+    INSERT INTO weather_cache
+        (lat, lon, hour_utc, temperature, precipitation, snowfall, weathercode, windspeed, cloudcover, humidity,
+         is_final)
+    SELECT cd.lat_r, cd.lon_r, cd.day + make_interval(hours => h),
+           random() * 30 - 10, random() * 2, 0, (ARRAY[0, 1, 2, 3, 45, 61, 71, 95])[1 + (random() * 7)::int],
+           random() * 30, random() * 100, random() * 100, true
+    FROM (
+        SELECT DISTINCT ROUND(lat, 2) AS lat_r, ROUND(lon, 2) AS lon_r, date_trunc('day', occ_date_utc) AS day
+        FROM raw_incidents
+        WHERE event_id LIKE 'BENCH-%' AND lat IS NOT NULL
+    ) cd
+    CROSS JOIN generate_series(0, 23) AS h
+    ON CONFLICT (lat, lon, hour_utc) DO NOTHING
+"""
+
+
+def seed(conn, years: int, per_day: int):
+    """Load synthetic incidents and weather; works before and after migration 005."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT setseed(0.42)")  # same synthetic data on every database
+        cur.execute("SELECT to_regproc('ensure_raw_incidents_partition') IS NOT NULL")
+        if cur.fetchone()[0]:
+            cur.execute("""
+                SELECT ensure_raw_incidents_partition(m)
+                FROM generate_series(date_trunc('month', now()) - make_interval(years => %s), now(), interval '1 month') m
+            """, (years,))
+        cur.execute(SEED_INCIDENTS_SQL, {"years": years, "per_day": per_day})
+        incidents = cur.rowcount
+        cur.execute(SEED_WEATHER_SQL)
+        weather = cur.rowcount
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE raw_incidents")
+        cur.execute("ANALYZE weather_cache")
+    conn.commit()
+    print(f"seeded {incidents:,} incidents, {weather:,} weather rows")
+
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            DELETE FROM weather_cache w
+            USING (SELECT DISTINCT ROUND(lat, 2) AS lat_r, ROUND(lon, 2) AS lon_r, occ_date_utc::date AS day
+                   FROM raw_incidents WHERE event_id LIKE 'BENCH-%') cd
+            WHERE w.lat = cd.lat_r AND w.lon = cd.lon_r AND w.date_utc = cd.day
+        """)
+        cur.execute("DELETE FROM raw_incidents WHERE event_id LIKE 'BENCH-%'")
+    conn.commit()
+
+
+def dbt_run(project_dir: str, label: str, args: list) -> dict:
+    """Run dbt; print wall time and per-model execution time; return {model: seconds}."""
+    start = time.perf_counter()
+    subprocess.run(["dbt", "run", "--project-dir", project_dir] + args, check=True, capture_output=True)
+    wall = time.perf_counter() - start
+
+    with open(os.path.join(project_dir, "target", "run_results.json")) as f:
+        results = json.load(f)["results"]
+    timings = {r["unique_id"].split(".")[-1]: r["execution_time"] for r in results}
+
+    print(f"{label:<22} wall {wall:6.2f}s, models {sum(timings.values()):6.2f}s")
+    for model, secs in timings.items():
+        print(f"    {model:<30}{secs:7.2f}s")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rollup marts against fct_incidents_flat.")
+    parser.add_argument("--seed", action="store_true", help="Load synthetic incidents and weather first")
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--per-day", type=int, default=150)
+    parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic rows afterwards")
+    args = parser.parse_args()
+    project_dir = getenv("DBT_PROJECT_DIR", DEFAULT_DBT_PROJECT_DIR)
+
+    conn = get_db_conn()
+    try:
+        if args.seed:
+            seed(conn, args.years, args.per_day)
+
+        dbt_run(project_dir, "flat (+upstream)", ["--select", "+fct_incidents_flat"])
+        dbt_run(project_dir, "rollups full refresh", ["--select"] + ROLLUP_MODELS + ["--full-refresh"])
+        dbt_run(project_dir, "rollups incremental", ["--select"] + ROLLUP_MODELS)
+
+        with tempfile.TemporaryDirectory() as out_dir:
+            flat_rows, flat_bytes, flat_secs = export_table(conn, FLAT_TABLE, os.path.join(out_dir, "flat.csv"))
+            print(f"export {FLAT_TABLE:<34}{flat_rows:>10,} rows {flat_bytes / 1e6:8.2f} MB {flat_secs:6.2f}s")
+            for table in ROLLUP_TABLES:
+                rows, size, secs = export_table(conn, table, os.path.join(out_dir, f"{table}.csv"))
+                print(f"export {table:<34}{rows:>10,} rows {size / 1e6:8.2f} MB {secs:6.2f}s "
+                      f"({size / flat_bytes:.1%} of flat)")
+
+        if args.cleanup:
+            cleanup(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
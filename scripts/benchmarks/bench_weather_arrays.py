@@ -0,0 +1,133 @@
+"""
+Compare memory and CPU time per 1M Open-Meteo hourly rows:
+
+  old: hourly lists of Python floats; per row fromisoformat() + 10-tuple
+  new: to_hourly_arrays() typed columns packed into a binary COPY buffer
+
+Memory is the retained size of the hourly payload in each representation.
+The old column includes the parsed JSON lists. The new column counts only
+the arrays, because the lists can be freed after conversion.
+
+With --db, also time loading into a scratch copy of weather_cache on the
+configured database: old = one prepared EXECUTE per row, new =
+upsert_hourly_arrays() (COPY into weather_stage + one INSERT ... ON CONFLICT).
+
+Usage: python -m scripts.benchmarks.bench_weather_arrays [--rows N] [--db]
+"""
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+from scripts import build_weather_cache
+from scripts.build_weather_cache import to_hourly_arrays, _copy_buffer
+
+
+def make_payload(n: int, unixtime: bool) -> dict:
+    start = datetime(2020, 1, 1)
+    if unixtime:
+        times = [1577836800 + 3600 * i for i in range(n)]
+    else:
+        times = [(start + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M") for i in range(n)]
+    return {"hourly": {
+        "time": times,
+        "temperature_2m": [(i % 400) / 10 - 20 for i in range(n)],
+        "precipitation": [(i % 7) / 10 for i in range(n)],
+        "snowfall": [(i % 5) / 10 for i in range(n)],
+        "weathercode": [i % 4 for i in range(n)],
+        "windspeed_10m": [(i % 300) / 10 for i in range(n)],
+        "cloudcover": [float(i % 101) for i in range(n)],
+        "relative_humidity_2m": [float(i % 100) for i in range(n)],
+    }}
+
+
+def old_rows(weather_json: dict):
+    hourly = weather_json["hourly"]
+    for i, ts in enumerate(hourly["time"]):
+        hour_utc = datetime.fromisoformat(ts)
+        yield (
+            43.65, -79.38, hour_utc,
+            hourly["temperature_2m"][i], hourly["precipitation"][i], hourly["snowfall"][i],
+            hourly["weathercode"][i], hourly["windspeed_10m"][i], hourly["cloudcover"][i],
+            hourly["relative_humidity_2m"][i],
+        )
+
+
+def new_buffer(weather_json: dict):
+    yield _copy_buffer(to_hourly_arrays(weather_json))
+
+
+OLD_UPSERT_SQL = """
+    INSERT INTO weather_cache
+        (lat, lon, hour_utc, temperature, precipitation, snowfall, weathercode, windspeed, cloudcover, humidity)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    ON CONFLICT (lat, lon, hour_utc) DO NOTHING
+"""
+
+
+def bench_db_load(payload: dict):
+    """Wall and client CPU time to load `payload` into a temp copy of weather_cache."""
+    from scripts.utils.db_utils import get_db_conn, execute_prepared
+
+    conn = get_db_conn()
+    try:
+        with conn.cursor() as cur:
+            # Temp table shadows weather_cache for this session only
+            cur.execute("CREATE TEMP TABLE weather_cache (LIKE public.weather_cache INCLUDING ALL)")
+            for label, load in (
+                ("old (EXECUTE per row)", lambda: [
+                    execute_prepared(cur, "bench_upsert", OLD_UPSERT_SQL, row) for row in old_rows(payload)
+                ]),
+                ("new (COPY + upsert)", lambda: build_weather_cache.upsert_hourly_arrays(
+                    conn, 43.65, -79.38, to_hourly_arrays(payload)
+                )),
+            ):
+                cur.execute("TRUNCATE weather_cache")
+                wall, cpu = time.perf_counter(), time.process_time()
+                load()
+                conn.commit()
+                print(f"db load {label:<22} wall {time.perf_counter() - wall:6.2f}s, "
+                      f"cpu {time.process_time() - cpu:5.2f}s")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def cpu_time(fn, payload: dict) -> float:
+    start = time.process_time()
+    for _ in fn(payload):
+        pass
+    return time.process_time() - start
+
+
+def retained(build):
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark weather payload representations.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--db", action="store_true", help="Also time loading into the database")
+    args = parser.parse_args()
+    n = args.rows
+
+    payload, list_bytes = retained(lambda: make_payload(n, unixtime=False))
+    _, array_bytes = retained(lambda: to_hourly_arrays(payload))
+    print(f"{n:,} hourly rows")
+    print(f"memory: lists {list_bytes / 1e6:.1f} MB, arrays {array_bytes / 1e6:.1f} MB")
+
+    print(f"cpu old (ISO, per-row datetime): {cpu_time(old_rows, payload):.2f}s")
+    print(f"cpu new (ISO times, COPY buffer): {cpu_time(new_buffer, payload):.2f}s")
+    if args.db:
+        bench_db_load(payload)
+    payload = make_payload(n, unixtime=True)
+    print(f"cpu new (unixtime, COPY buffer): {cpu_time(new_buffer, payload):.2f}s")
+    print(f"cpu convert only (unixtime):     {cpu_time(lambda p: [to_hourly_arrays(p)], payload):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,29 @@
-import os
-import sys
+import io
 import time
+import struct
 import psycopg2
 import psycopg2.extensions
-import requests
 import argparse
 import logging
-from typing import List, Tuple
-from datetime import datetime, date
+from typing import Dict, List, Tuple
+from datetime import datetime, date, timedelta, timezone
 
+import numpy as np
+
+from scripts.utils.config import getenv, setup_logging
 from scripts.utils.logging_utils import log_run_start, log_run_end
+from scripts.utils import json_utils
+from scripts.utils.db_utils import (
+    acquire_conn,
+    release_conn,
+    close_pool,
+    execute_prepared,
+    CommitBatcher,
+)
 
 # ========================
 # Logger Setup
 # ========================
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
 logger = logging.getLogger(__name__)
 
 # ========================
@@ -29,22 +34,70 @@ MAX_RETRIES = 3
 RETRY_BACKOFF = 2  # seconds
 SLEEP_BETWEEN_CALLS = 0.7
 
-# DB params
-DB_NAME = os.getenv("DB_NAME", "weather_accident_db")
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = int(os.getenv("DB_PORT", 5432))
+# Days before Open-Meteo's archive values are final (WEATHER_ARCHIVE_LAG_DAYS
+# overrides). Rows for more recent days are stored as provisional
+# (is_final = false) and refetched once they age past the lag; final rows
+# are never requested again. dbt's rollup_lookback_days (14) must stay well
+# above this lag, or finalized values can fall outside the incremental
+# window of the agg_* rollups.
+ARCHIVE_LAG_DAYS = 7
+
+# Hourly rows are staged with binary COPY straight from the typed arrays and
+# merged in one statement. Float columns arrive with NaN and weathercode with
+# WEATHERCODE_NULL for missing values; NULLIF maps both back to NULL.
+STAGE_WEATHER_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS weather_stage (
+        hour_epoch BIGINT, temperature REAL, precipitation REAL, snowfall REAL, weathercode SMALLINT,
+        windspeed REAL, cloudcover REAL, humidity REAL
+    ) ON COMMIT DELETE ROWS
+"""
+
+COPY_WEATHER_SQL = "COPY weather_stage FROM STDIN WITH (FORMAT binary)"
 
+# Force mode: overwrite every staged hour, including rows already final
+UPSERT_WEATHER_FORCE_SQL = """
+    WITH staged AS (DELETE FROM weather_stage RETURNING *)
+    INSERT INTO weather_cache
+        (lat, lon, hour_utc, temperature, precipitation, snowfall, weathercode, windspeed, cloudcover, humidity,
+         is_final)
+    SELECT DISTINCT ON (hour_epoch)
+        $1::numeric(8,5), $2::numeric(8,5), to_timestamp(hour_epoch),
+        NULLIF(temperature, 'NaN'), NULLIF(precipitation, 'NaN'), NULLIF(snowfall, 'NaN'),
+        NULLIF(weathercode, -1), NULLIF(windspeed, 'NaN'), NULLIF(cloudcover, 'NaN'), NULLIF(humidity, 'NaN'),
+        hour_epoch < $3::bigint
+    FROM staged
+    ON CONFLICT (lat, lon, hour_utc) DO UPDATE SET
+        temperature = EXCLUDED.temperature,
+        precipitation = EXCLUDED.precipitation,
+        snowfall = EXCLUDED.snowfall,
+        weathercode = EXCLUDED.weathercode,
+        windspeed = EXCLUDED.windspeed,
+        cloudcover = EXCLUDED.cloudcover,
+        humidity = EXCLUDED.humidity,
+        is_final = EXCLUDED.is_final
+"""
 
-def get_db_conn():
-    return psycopg2.connect(
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-    )
+# Normal runs never touch final rows
+UPSERT_WEATHER_SQL = UPSERT_WEATHER_FORCE_SQL + """    WHERE NOT weather_cache.is_final
+"""
+
+# Open-Meteo hourly field -> (weather_cache column, array dtype).
+# Float columns use NaN for nulls; weathercode uses WEATHERCODE_NULL.
+HOURLY_FIELDS = [
+    ("temperature_2m", "temperature", np.float32),
+    ("precipitation", "precipitation", np.float32),
+    ("snowfall", "snowfall", np.float32),
+    ("weathercode", "weathercode", np.int16),
+    ("windspeed_10m", "windspeed", np.float32),
+    ("cloudcover", "cloudcover", np.float32),
+    ("relative_humidity_2m", "humidity", np.float32),
+]
+WEATHERCODE_NULL = -1
+HOUR_NULL = np.iinfo(np.int64).min  # same value NaT casts to
+
+# PostgreSQL binary COPY framing (header: signature, flags, extension length)
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
 
 
 # ========================
@@ -59,6 +112,7 @@ def build_url(lat: float, lon: float, start_date: date, end_date: date) -> str:
         "end_date": end_date.strftime("%Y-%m-%d"),
         "hourly": "temperature_2m,precipitation,snowfall,weathercode,windspeed_10m,cloudcover,relative_humidity_2m",
         "timezone": "UTC",
+        "timeformat": "unixtime",
     }
     return BASE_URL + "?" + "&".join(f"{k}={v}" for k, v in params.items())
 
@@ -67,11 +121,13 @@ def build_url(lat: float, lon: float, start_date: date, end_date: date) -> str:
 # Helper: Fetch with Retry
 # ========================
 def fetch_with_retry(url: str, retries: int = MAX_RETRIES):
+    import requests  # deferred: keeps no-op runs from paying its import cost
+
     for attempt in range(1, retries + 1):
         try:
             resp = requests.get(url, timeout=30)
             resp.raise_for_status()
-            return resp.json()
+            return json_utils.loads(resp.content)
         except Exception as e:
             logger.warning(f"Error on attempt {attempt}: {e}")
             if attempt < retries:
@@ -84,136 +140,289 @@ def fetch_with_retry(url: str, retries: int = MAX_RETRIES):
 
 
 # ========================
-# Upsert Weather Rows
+# Helper: Archive Finalization
 # ========================
-def upsert_weather_cache(conn, lat: float, lon: float, weather_json: dict):
-    """Insert hourly weather into weather_cache."""
-    if not weather_json or "hourly" not in weather_json:
-        logger.warning("No hourly data in response")
-        return 0
+def archive_lag_days() -> int:
+    return int(getenv("WEATHER_ARCHIVE_LAG_DAYS", ARCHIVE_LAG_DAYS))
 
-    hourly = weather_json["hourly"]
-    times = hourly.get("time", [])
-    row_count = 0
 
-    with conn.cursor() as cur:
+def final_cutoff_date(today: date = None) -> date:
+    """Latest UTC date whose archive values are final."""
+    today = today or datetime.now(timezone.utc).date()
+    return today - timedelta(days=archive_lag_days())
+
+
+def _final_cutoff_epoch(today: date = None) -> int:
+    """Hours strictly before this epoch second are final."""
+    first_provisional = final_cutoff_date(today) + timedelta(days=1)
+    return int(datetime.combine(first_provisional, datetime.min.time(), timezone.utc).timestamp())
+
+
+# ========================
+# Convert to Typed Arrays
+# ========================
+def _parse_hours(times: list) -> np.ndarray:
+    """Epoch seconds (int64) for unixtime or ISO times; HOUR_NULL marks null or malformed entries."""
+    first = next((t for t in times if t is not None), None)
+    if not isinstance(first, str):
+        hours = np.array(times, dtype=np.float64)  # None -> NaN
+        nulls = np.isnan(hours)
+        if nulls.any():
+            logger.warning(f"Skipping {int(nulls.sum())} null timestamps")
+        return np.where(nulls, HOUR_NULL, hours).astype(np.int64)
+    try:
+        return np.array(times, dtype="datetime64[s]").astype(np.int64)  # already UTC; None -> NaT
+    except ValueError:
+        hours = np.empty(len(times), dtype=np.int64)
         for i, ts in enumerate(times):
             try:
-                hour_utc = datetime.fromisoformat(ts)  # already UTC
+                hours[i] = np.datetime64(ts, "s").astype(np.int64)
             except ValueError as ve:
                 logger.warning(f"Skipping malformed timestamp: {ts} ({ve})")
-                continue
+                hours[i] = HOUR_NULL
+        return hours
 
-            cur.execute(
-                """
-                INSERT INTO weather_cache
-                    (lat, lon, hour_utc, temperature, precipitation, snowfall, weathercode, windspeed, cloudcover, humidity)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (lat, lon, hour_utc) DO UPDATE SET
-                    temperature = EXCLUDED.temperature,
-                    precipitation = EXCLUDED.precipitation,
-                    snowfall = EXCLUDED.snowfall,
-                    weathercode = EXCLUDED.weathercode,
-                    windspeed = EXCLUDED.windspeed,
-                    cloudcover = EXCLUDED.cloudcover,
-                    humidity = EXCLUDED.humidity
-                """,
-                (
-                    round(lat, 2),
-                    round(lon, 2),
-                    hour_utc,
-                    hourly["temperature_2m"][i],
-                    hourly["precipitation"][i],
-                    hourly["snowfall"][i],
-                    hourly["weathercode"][i],
-                    hourly["windspeed_10m"][i],
-                    hourly["cloudcover"][i],
-                    hourly["relative_humidity_2m"][i],
-                ),
-            )
-            row_count += 1
+
+def to_hourly_arrays(weather_json: dict) -> Dict[str, np.ndarray]:
+    """
+    Convert an Open-Meteo response's `hourly` block into typed columns, once.
+
+    Returns {"hour_epoch": int64, "<column>": float32/int16, ...} keyed by
+    weather_cache column names. Rows with null or malformed timestamps are
+    dropped. Raises ValueError if a value column's length differs from `time`.
+    """
+    hourly = weather_json["hourly"]
+    hour_epoch = _parse_hours(hourly.get("time", []))
+    n = len(hour_epoch)
+
+    arrays = {"hour_epoch": hour_epoch}
+    for field, column, dtype in HOURLY_FIELDS:
+        raw = hourly.get(field, [None] * n)
+        if len(raw) != n:
+            raise ValueError(f"hourly.{field} has {len(raw)} values for {n} timestamps")
+        values = np.array(raw, dtype=np.float32)
+        if dtype is np.int16:
+            values = np.where(np.isnan(values), WEATHERCODE_NULL, values).astype(np.int16)
+        arrays[column] = values
+
+    valid = hour_epoch != HOUR_NULL  # NaT is int64 min too
+    if not valid.all():
+        arrays = {k: v[valid] for k, v in arrays.items()}
+    return arrays
+
+
+def _copy_buffer(arrays: Dict[str, np.ndarray]) -> io.BytesIO:
+    """Binary COPY payload for weather_stage, packed from the arrays without per-row Python objects."""
+    columns = [("hour_epoch", ">i8")] + [
+        (column, ">i2" if dtype is np.int16 else ">f4") for _, column, dtype in HOURLY_FIELDS
+    ]
+    fields = [("nfields", ">i2")]
+    for column, be_dtype in columns:
+        fields += [(f"{column}_len", ">i4"), (column, be_dtype)]
+
+    records = np.empty(len(arrays["hour_epoch"]), dtype=np.dtype(fields))
+    records["nfields"] = len(columns)
+    for column, be_dtype in columns:
+        records[f"{column}_len"] = np.dtype(be_dtype).itemsize
+        records[column] = arrays[column]
+    return io.BytesIO(COPY_HEADER + records.tobytes() + COPY_TRAILER)
+
+
+# ========================
+# Upsert Weather Rows
+# ========================
+def upsert_hourly_arrays(conn, lat: float, lon: float, arrays: Dict[str, np.ndarray], force: bool = False):
+    """
+    Insert typed hourly columns (see to_hourly_arrays) into weather_cache.
+    Returns the number of rows inserted or updated; final rows are left alone
+    unless `force` is set.
+    """
+    staged = len(arrays["hour_epoch"])
+    if not staged:
+        return 0
+
+    if force:
+        name, sql = "upsert_weather_cache_force", UPSERT_WEATHER_FORCE_SQL
+    else:
+        name, sql = "upsert_weather_cache", UPSERT_WEATHER_SQL
+    with conn.cursor() as cur:
+        cur.execute(STAGE_WEATHER_SQL)
+        cur.copy_expert(COPY_WEATHER_SQL, _copy_buffer(arrays))
+        execute_prepared(cur, name, sql, (round(lat, 2), round(lon, 2), _final_cutoff_epoch()))
+        row_count = cur.rowcount
+
+    if row_count < staged:
+        logger.info(f"Kept {staged - row_count} final rows unchanged for ({lat}, {lon})")
     return row_count
 
 
+def upsert_weather_cache(conn, lat: float, lon: float, weather_json: dict, force: bool = False):
+    """Insert hourly weather into weather_cache; see upsert_hourly_arrays."""
+    if not weather_json or "hourly" not in weather_json:
+        logger.warning("No hourly data in response")
+        return 0
+
+    try:
+        arrays = to_hourly_arrays(weather_json)
+    except ValueError as ve:
+        logger.warning(f"Malformed hourly data for ({lat}, {lon}): {ve}")
+        return 0
+    return upsert_hourly_arrays(conn, lat, lon, arrays, force=force)
+
+
 # ========================
 # Bulk: Find missing lat/lon ranges
 # ========================
 def find_missing_ranges(conn) -> List[Tuple[float, float, date, date]]:
     """
-    Return distinct (lat, lon, start_date, end_date) for coordinates
-    with missing weather data.
+    Return (lat, lon, start_date, end_date) ranges of incident days with no
+    cached weather. Ranges are split around days already cached as final,
+    so a request never spans finalized data.
     """
     with conn.cursor() as cur:
         cur.execute("""
             WITH coord_dates AS (
-                SELECT
-                    ROUND(lat::numeric, 2) AS lat_r,
-                    ROUND(lon::numeric, 2) AS lon_r,
+                -- lat_r/lon_r are stored on raw_incidents (weather-key index)
+                SELECT DISTINCT
+                    lat_r,
+                    lon_r,
                     DATE(occ_date_utc) AS day_utc
                 FROM raw_incidents
-                WHERE lat IS NOT NULL AND lon IS NOT NULL
+                WHERE lat_r IS NOT NULL AND lon_r IS NOT NULL
                   AND NOT (lat = 0 AND lon = 0)
             ),
-            missing_dates AS (
-                SELECT cd.lat_r, cd.lon_r, cd.day_utc
+            day_status AS (
+                SELECT cd.lat_r, cd.lon_r, cd.day_utc,
+                       COUNT(wc.hour_utc) AS cached_hours,
+                       COALESCE(BOOL_AND(wc.is_final), false) AS is_final
                 FROM coord_dates cd
                 LEFT JOIN weather_cache wc
                   ON wc.lat = cd.lat_r
                  AND wc.lon = cd.lon_r
-                 AND DATE(wc.hour_utc) = cd.day_utc
-                WHERE wc.hour_utc IS NULL
+                 AND wc.date_utc = cd.day_utc
+                GROUP BY cd.lat_r, cd.lon_r, cd.day_utc
+            ),
+            islands AS (
+                -- A new island starts after every finalized day
+                SELECT *,
+                       COUNT(*) FILTER (WHERE is_final)
+                           OVER (PARTITION BY lat_r, lon_r ORDER BY day_utc) AS island
+                FROM day_status
             )
             SELECT lat_r, lon_r,
                    MIN(day_utc) AS start_date,
                    MAX(day_utc) AS end_date
-            FROM missing_dates
-            GROUP BY lat_r, lon_r
-            ORDER BY lat_r, lon_r
+            FROM islands
+            WHERE cached_hours = 0
+            GROUP BY lat_r, lon_r, island
+            ORDER BY lat_r, lon_r, start_date
         """)
         return cur.fetchall()  # List[Tuple[lat, lon, start_date, end_date]]
 
 
+# ========================
+# Bulk: Find provisional ranges ready to finalize
+# ========================
+def find_provisional_ranges(conn) -> List[Tuple[float, float, date, date]]:
+    """
+    Return contiguous (lat, lon, start_date, end_date) ranges of provisional
+    rows whose days have aged past the archive lag and can now be refetched
+    as final.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH provisional_days AS (
+                SELECT DISTINCT lat, lon, date_utc
+                FROM weather_cache
+                WHERE NOT is_final
+                  AND date_utc <= %s
+            ),
+            islands AS (
+                SELECT *,
+                       date_utc - (ROW_NUMBER() OVER (PARTITION BY lat, lon ORDER BY date_utc))::int AS island
+                FROM provisional_days
+            )
+            SELECT lat, lon,
+                   MIN(date_utc) AS start_date,
+                   MAX(date_utc) AS end_date
+            FROM islands
+            GROUP BY lat, lon, island
+            ORDER BY lat, lon, start_date
+        """, (final_cutoff_date(),))
+        return cur.fetchall()
+
+
+# ========================
+# Helper: Merge fetch ranges
+# ========================
+def merge_ranges(ranges) -> List[Tuple[float, float, date, date]]:
+    """
+    Merge overlapping or adjacent (lat, lon, start_date, end_date) ranges per
+    cell, so no day is requested twice when missing and provisional ranges
+    cover the same days.
+    """
+    merged = []
+    for lat, lon, start, end in sorted(ranges):
+        if merged:
+            m_lat, m_lon, m_start, m_end = merged[-1]
+            if (m_lat, m_lon) == (lat, lon) and start <= m_end + timedelta(days=1):
+                merged[-1] = (m_lat, m_lon, m_start, max(m_end, end))
+                continue
+        merged.append((lat, lon, start, end))
+    return merged
+
+
 # ========================
 # Main
 # ========================
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--lat", type=float, help="Latitude (force mode)")
     parser.add_argument("--lon", type=float, help="Longitude (force mode)")
     parser.add_argument("--date", type=str, help="Date YYYY-MM-DD (force mode)")
     parser.add_argument("--triggered-by", default="manual")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    setup_logging()
 
-    conn = get_db_conn()
+    conn = acquire_conn(bulk_load=True)
     run_id = log_run_start(conn, "weather_cache", args.triggered_by)
 
     try:
-        if args.lat is not None and args.lon is not None and args.date is not None:
-            # Force mode: single day
+        force = args.lat is not None and args.lon is not None and args.date is not None
+        if force:
+            # Force mode: single day, overwriting final rows too
             targets = [(round(args.lat, 2), round(args.lon, 2),
                         datetime.strptime(args.date, "%Y-%m-%d").date(),
                         datetime.strptime(args.date, "%Y-%m-%d").date())]
         else:
-            # Bulk mode: fetch missing ranges
-            targets = find_missing_ranges(conn)
+            # Bulk mode: fetch missing ranges plus provisional ranges that
+            # have aged past the archive lag, merged so each day is fetched once
+            targets = list(find_missing_ranges(conn))
+            refresh = list(find_provisional_ranges(conn))
+            if refresh:
+                logger.info(f"Found {len(refresh)} provisional ranges ready to finalize.")
+            targets = merge_ranges(targets + refresh)
 
         if not targets:
-            logger.info("No missing weather data found. Nothing to fetch.")
+            logger.info("No missing or provisional weather data found. Nothing to fetch.")
         else:
-            logger.info(f"Found {len(targets)} coordinates to fetch weather for.")
+            logger.info(f"Found {len(targets)} ranges to fetch weather for.")
 
         total_rows = 0
+        batcher = CommitBatcher(conn)
         for lat, lon, start_date, end_date in targets:
             logger.info(f"Fetching weather for ({lat}, {lon}) from {start_date} to {end_date}")
             url = build_url(lat, lon, start_date, end_date)
             data = fetch_with_retry(url)
             if data:
-                rows = upsert_weather_cache(conn, lat, lon, data)
+                rows = upsert_weather_cache(conn, lat, lon, data, force=force)
                 total_rows += rows
-                conn.commit()
-                logger.info(f"Committed {rows} rows for ({lat}, {lon})")
+                batcher.add(rows)
+                logger.info(f"Upserted {rows} rows for ({lat}, {lon})")
             time.sleep(SLEEP_BETWEEN_CALLS)
 
+        batcher.flush()
+
         log_run_end(conn, run_id, "success", row_count=total_rows)
 
     except Exception as e:
@@ -227,7 +436,8 @@ def main():
         raise
     finally:
         if conn:
-            conn.close()
+            release_conn(conn)
+        close_pool()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+"""
+Unified pipeline CLI.
+
+    wap ingest  [args]   fetch TPS incidents        (scripts.fetch_tps_incidents)
+    wap weather [args]   build the weather cache    (scripts.build_weather_cache)
+    wap export  [args]   export marts for Tableau   (scripts.export_for_tableau)
+    wap run     [--triggered-by X]   ingest -> weather -> dbt build -> export
+
+Subcommand modules (and their psycopg2/numpy/pandas imports) are loaded only
+when that subcommand runs. Arguments after the subcommand go to its own
+parser, e.g. `wap weather --lat 43.65 --lon -79.38 --date 2024-01-01`.
+
+`wap --profile-startup <command>` reports in-process startup time against
+STARTUP_BUDGET_MS and exits without running the command (exit 1 if over).
+
+`wap run` rebuilds the dbt models between weather and export, so the export
+reads marts that include the rows just loaded. The project directory is
+DBT_PROJECT_DIR (default: dbt/ in the repo); dbt finds its profile as usual.
+"""
+import time
+
+_CLI_START = time.perf_counter()
+
+import os
+import sys
+import argparse
+import importlib
+import subprocess
+
+from scripts.utils.config import getenv, load_env
+
+# ========================
+# CONFIG
+# ========================
+SUBCOMMANDS = {
+    "ingest": "scripts.fetch_tps_incidents",
+    "weather": "scripts.build_weather_cache",
+    "export": "scripts.export_for_tableau",
+}
+RUN_ORDER = ["ingest", "weather", "dbt", "export"]
+DBT_STEP = "dbt"  # run step that shells out to `dbt build` instead of importing a module
+DEFAULT_DBT_PROJECT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dbt")
+
+# Cold-start budget per subcommand (ms): CLI start through subcommand import,
+# interpreter start excluded. Measured warm-cache at roughly ingest 80,
+# weather 130, export 480, run 490 ms; budgets leave headroom for slower hosts.
+STARTUP_BUDGET_MS = {
+    "ingest": 150,
+    "weather": 250,
+    "export": 700,
+    "run": 800,
+}
+
+
+# ========================
+# Helper: Lazy Subcommand Import
+# ========================
+def import_subcommand(name: str):
+    """Import a subcommand module; return (module, elapsed_ms, new_module_count)."""
+    before = len(sys.modules)
+    start = time.perf_counter()
+    module = importlib.import_module(SUBCOMMANDS[name])
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return module, elapsed_ms, len(sys.modules) - before
+
+
+def profile_startup(command: str) -> int:
+    """Print a startup report for `command`; return 0 if within budget, else 1."""
+    config_start = time.perf_counter()
+    load_env()
+    config_ms = (time.perf_counter() - config_start) * 1000
+
+    print(f"startup profile: {command}", file=sys.stderr)
+    print(f"  cli + config   {(config_start - _CLI_START) * 1000 + config_ms:8.1f} ms", file=sys.stderr)
+    for name in (RUN_ORDER if command == "run" else [command]):
+        if name == DBT_STEP:
+            continue
+        _, elapsed_ms, new_modules = import_subcommand(name)
+        print(f"  import {name:<8}{elapsed_ms:8.1f} ms  ({new_modules} modules)", file=sys.stderr)
+
+    total_ms = (time.perf_counter() - _CLI_START) * 1000
+    budget_ms = STARTUP_BUDGET_MS[command]
+    status = "OK" if total_ms <= budget_ms else "OVER BUDGET"
+    print(f"  total          {total_ms:8.1f} ms  (budget {budget_ms} ms) {status}", file=sys.stderr)
+    return 0 if total_ms <= budget_ms else 1
+
+
+def run_dbt_build() -> None:
+    """Run `dbt build` on the project; raises CalledProcessError if any model or test fails."""
+    project_dir = getenv("DBT_PROJECT_DIR", DEFAULT_DBT_PROJECT_DIR)
+    subprocess.run(["dbt", "build", "--project-dir", project_dir], check=True)
+
+
+def run_pipeline(argv) -> None:
+    """Run ingest, weather, dbt build and export in order with a shared --triggered-by."""
+    parser = argparse.ArgumentParser(prog="wap run", description="Run the full pipeline.")
+    parser.add_argument("--triggered-by", default="manual")
+    args = parser.parse_args(argv)
+
+    for name in RUN_ORDER:
+        if name == DBT_STEP:
+            run_dbt_build()
+            continue
+        module, _, _ = import_subcommand(name)
+        module.main(["--triggered-by", args.triggered_by])
+
+
+# ========================
+# CLI Entry Point
+# ========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="wap", description="Weather/accident pipeline CLI.")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Report startup time for the command against its budget, then exit",
+    )
+    parser.add_argument("command", choices=list(SUBCOMMANDS) + ["run"])
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the subcommand")
+    args = parser.parse_args(argv)
+
+    if args.profile_startup:
+        sys.exit(profile_startup(args.command))
+
+    load_env()
+    if args.command == "run":
+        run_pipeline(args.args)
+    else:
+        module, _, _ = import_subcommand(args.command)
+        module.main(args.args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,97 @@
 import os
-import sys
+import time
 import logging
 import argparse
 import pandas as pd
 import psycopg2
 
-from scripts.fetch_tps_incidents import get_db_conn
+from scripts.utils.db_utils import acquire_conn, release_conn, close_pool
+from scripts.utils.config import setup_logging
 from scripts.utils.logging_utils import log_run_start, log_run_end
 
 # ========================
 # Logger Setup
 # ========================
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
 logger = logging.getLogger(__name__)
 
+# ========================
+# CONFIG
+# ========================
+FLAT_TABLE = "dbt.fct_incidents_flat"
+ROLLUP_TABLES = [
+    "dbt.agg_incidents_daily",
+    "dbt.agg_weather_exposure_hourly",
+]
+
+
+# ========================
+# Helper: Export One Table
+# ========================
+def export_table(conn, table: str, output_path: str):
+    """Export one table to CSV; return (row_count, bytes_written, seconds)."""
+    start = time.perf_counter()
+    logger.info(f"Querying {table}...")
+    df = pd.read_sql_query(f"SELECT * FROM {table};", conn)
+    logger.info(f"Fetched {len(df):,} rows.")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    df.to_csv(output_path, index=False)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(output_path)
+    logger.info(f"Exported {table} to {output_path} ({size:,} bytes in {elapsed:.2f}s)")
+    return len(df), size, elapsed
+
+
 # ========================
 # Main Export Function
 # ========================
-def export_for_tableau(output_path: str, triggered_by: str = "manual"):
-    """Query fct_incidents_flat and export to CSV for Tableau."""
-    conn = get_db_conn()
+def export_for_tableau(output_path: str, triggered_by: str = "manual", rollups: bool = False):
+    """
+    Query fct_incidents_flat and export to CSV for Tableau.
+
+    With rollups=True, export the pre-aggregated rollup marts instead, one CSV
+    per table next to output_path, and log their size and export time against
+    the existing flat export at output_path (if present).
+    """
+    conn = acquire_conn()
     run_id = log_run_start(conn, "export_for_tableau", triggered_by)
 
     try:
-        logger.info("Setting session time zone to UTC...")
-        with conn.cursor() as cur:
-            cur.execute("SET TIME ZONE 'UTC';")
+        if not rollups:
+            row_count, _, _ = export_table(conn, FLAT_TABLE, output_path)
+        else:
+            out_dir = os.path.dirname(output_path)
+            row_count, total_bytes, total_secs = 0, 0, 0.0
+            for table in ROLLUP_TABLES:
+                path = os.path.join(out_dir, table.split(".")[-1] + ".csv")
+                rows, size, secs = export_table(conn, table, path)
+                row_count += rows
+                total_bytes += size
+                total_secs += secs
 
-        logger.info("Querying fct_incidents_flat...")
-        query = "SELECT * FROM dbt.fct_incidents_flat;"
-        df = pd.read_sql_query(query, conn)
-        logger.info(f"Fetched {len(df):,} rows.")
+            logger.info(f"Rollups: {row_count:,} rows, {total_bytes:,} bytes in {total_secs:.2f}s")
+            if os.path.exists(output_path):
+                flat_bytes = os.path.getsize(output_path)
+                if flat_bytes:
+                    logger.info(
+                        f"Rollups are {total_bytes / flat_bytes:.1%} of the flat export "
+                        f"({flat_bytes:,} bytes at {output_path})"
+                    )
 
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        df.to_csv(output_path, index=False)
-        logger.info(f"Exported data to {output_path}")
-
-        log_run_end(conn, run_id, "success", row_count=len(df))
+        log_run_end(conn, run_id, "success", row_count=row_count)
     except Exception as e:
         logger.error(f"Error during export: {e}", exc_info=True)
         log_run_end(conn, run_id, "failure", error_message=str(e))
         raise
     finally:
-        conn.close()
+        release_conn(conn)
+        close_pool()
 
 
 # ========================
 # CLI Entry Point
 # ========================
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description="Export fct_incidents_flat for Tableau.")
     parser.add_argument(
         "--output",
@@ -66,9 +105,15 @@ def main():
         default="manual",
         help="Source of trigger (manual, airflow, etc.)",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--rollups",
+        action="store_true",
+        help="Export the compact rollup marts (agg_*) instead of fct_incidents_flat",
+    )
+    args = parser.parse_args(argv)
+    setup_logging()
 
-    export_for_tableau(args.output, args.triggered_by)
+    export_for_tableau(args.output, args.triggered_by, rollups=args.rollups)
 
 
 if __name__ == "__main__":
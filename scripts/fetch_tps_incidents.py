@@ -1,26 +1,27 @@
 import os
-import sys
 import time
-import json
 import psycopg2
 import psycopg2.extensions
-import requests
 import argparse
 import logging
 from datetime import datetime, timedelta, time as dt_time
 from urllib.parse import quote, urlencode
 import pytz
 
+from scripts.utils.config import setup_logging
 from scripts.utils.logging_utils import log_run_start, log_run_end
+from scripts.utils import json_utils
+from scripts.utils.db_utils import (
+    acquire_conn,
+    release_conn,
+    close_pool,
+    execute_prepared,
+    CommitBatcher,
+)
 
 # ========================
 # Logger Setup
 # ========================
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
 logger = logging.getLogger(__name__)
 
 # ========================
@@ -38,21 +39,36 @@ TORONTO_TZ = pytz.timezone("America/Toronto")
 # Earliest date from which incident data should be fetched.
 PROJECT_BASELINE = TORONTO_TZ.localize(datetime(2024, 1, 1))
 
-# Fetch DB connection parameters once
-DB_NAME = os.getenv("DB_NAME", "weather_accident_db")
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
-DB_HOST = os.getenv("DB_HOST", "localhost")
-DB_PORT = int(os.getenv("DB_PORT", 5432))
-
-def get_db_conn():
-    return psycopg2.connect(
-        dbname=DB_NAME,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
+# The primary key is (event_id, occ_date_utc) because occ_date_utc is the
+# partition key. raw_incident_keys (migration 006) holds each event's current
+# occ_date_utc: when TPS revises OCC_DATE/OCC_HOUR the old row is deleted from
+# that one partition (pruned at run time) and the key is moved, in the same
+# statement, so event_id stays unique without probing every partition.
+UPSERT_RAW_INCIDENT_SQL = """
+    WITH prev AS (
+        SELECT occ_date_utc FROM raw_incident_keys WHERE event_id = $1
+    ),
+    moved_key AS (
+        INSERT INTO raw_incident_keys (event_id, occ_date_utc)
+        VALUES ($1, $4)
+        ON CONFLICT (event_id) DO UPDATE SET occ_date_utc = EXCLUDED.occ_date_utc
+        WHERE raw_incident_keys.occ_date_utc <> EXCLUDED.occ_date_utc
+    ),
+    moved AS (
+        DELETE FROM raw_incidents
+        WHERE event_id = $1
+          AND occ_date_utc = (SELECT occ_date_utc FROM prev)
+          AND occ_date_utc <> $4
     )
+    INSERT INTO raw_incidents (event_id, objectid, raw, occ_date_utc, lat, lon)
+    VALUES ($1, $2, $3::jsonb, $4, $5, $6)
+    ON CONFLICT (event_id, occ_date_utc)
+    DO UPDATE SET
+        objectid = EXCLUDED.objectid,
+        raw = EXCLUDED.raw,
+        lat = EXCLUDED.lat,
+        lon = EXCLUDED.lon
+"""
 
 
 # ========================
@@ -84,11 +100,21 @@ def build_url(date_local: datetime) -> str:
 # Helper: Fetch with Retry
 # ========================
 def fetch_with_retry(url: str, retries: int = MAX_RETRIES):
+    """
+    Return the raw response body (bytes); parsing is left to iter_features.
+    Bodies that aren't a complete JSON object (e.g. truncated) are retried.
+    """
+    import requests  # deferred: keeps no-op runs from paying its import cost
+
     for attempt in range(1, retries + 1):
         try:
             response = requests.get(url, timeout=15)
             response.raise_for_status()
-            return response.json()
+            body = response.content
+            stripped = body.strip()
+            if not (stripped.startswith(b"{") and stripped.endswith(b"}")):
+                raise ValueError(f"Incomplete JSON body ({len(body)} bytes)")
+            return body
         except Exception as e:
             logger.warning(f"Error on attempt {attempt}: {e}")
             if attempt < retries:
@@ -100,13 +126,29 @@ def fetch_with_retry(url: str, retries: int = MAX_RETRIES):
                 return None
 
 
+# ========================
+# Helper: Stream Features
+# ========================
+def iter_features(body: bytes):
+    """
+    Yield (feature, raw_json) pairs from a TPS response body one at a time.
+    raw_json is the feature's original text, reused for the JSONB column.
+    """
+    yield from json_utils.iter_array_items(body.decode("utf-8"), "features")
+
+
 # ========================
 # Insert into DB
 # ========================
 def upsert_raw_incidents(conn, features):
+    """
+    Upsert features into raw_incidents. Items are feature dicts or
+    (feature, raw_json) pairs from iter_features; raw_json is stored as-is.
+    """
     row_count = 0
     with conn.cursor() as cur:
-        for f in features:
+        for item in features:
+            f, raw_json = item if isinstance(item, tuple) else (item, None)
             attrs = f.get("attributes", {})
             geom = f.get("geometry", {})
 
@@ -142,22 +184,19 @@ def upsert_raw_incidents(conn, features):
                 logger.warning(f"Skipping OBJECTID={objectid} because EVENT_UNIQUE_ID is missing")
                 continue
 
-            cur.execute(
-                """
-                INSERT INTO raw_incidents (event_id, objectid, raw, occ_date_utc, lat, lon)
-                VALUES (%s, %s, %s::jsonb, %s, %s, %s)
-                ON CONFLICT (event_id)
-                DO UPDATE SET
-                    objectid = EXCLUDED.objectid,
-                    raw = EXCLUDED.raw,
-                    occ_date_utc = EXCLUDED.occ_date_utc,
-                    lat = EXCLUDED.lat,
-                    lon = EXCLUDED.lon
-                """,
+            # occ_date_utc is the partition key and part of the primary key
+            if occ_date_utc is None:
+                logger.warning(f"Skipping OBJECTID={objectid} because OCC_DATE is missing")
+                continue
+
+            execute_prepared(
+                cur,
+                "upsert_raw_incident",
+                UPSERT_RAW_INCIDENT_SQL,
                 (
                     event_id,
                     objectid,
-                    json.dumps(f),
+                    raw_json if raw_json is not None else json_utils.dumps(f),
                     occ_date_utc,
                     lat,
                     lon,
@@ -167,17 +206,39 @@ def upsert_raw_incidents(conn, features):
     return row_count
 
 
+# ========================
+# Helper: Monthly Partitions
+# ========================
+def ensure_partitions(conn, start_local: datetime, end_local: datetime):
+    """Create the raw_incidents monthly (UTC) partitions covering the load window."""
+    # Toronto is behind UTC: the last local day runs into the next UTC day
+    first = start_local.astimezone(pytz.UTC)
+    last = (end_local + timedelta(days=1)).astimezone(pytz.UTC)
+
+    months = []
+    month = datetime(first.year, first.month, 1, tzinfo=pytz.UTC)
+    while month <= last:
+        months.append(month)
+        month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=pytz.UTC)
+
+    with conn.cursor() as cur:
+        for month in months:
+            cur.execute("SELECT ensure_raw_incidents_partition(%s)", (month,))
+    conn.commit()
+
+
 # ========================
 # Main
 # ========================
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--start-date", type=str, help="Start date YYYY-MM-DD (Toronto local)")
     parser.add_argument("--end-date", type=str, help="End date YYYY-MM-DD (Toronto local)")
     parser.add_argument("--triggered-by", default="manual")
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    setup_logging()
 
-    conn = get_db_conn()
+    conn = acquire_conn(bulk_load=True)
     run_id = log_run_start(conn, "tps_ingest", args.triggered_by)
 
     try:
@@ -218,36 +279,54 @@ def main():
             raise ValueError("End date cannot be before start date.")
 
         logger.info(f"Fetching incidents {start_local.date()} → {end_local.date()}")
+        ensure_partitions(conn, start_local, end_local)
 
         total_rows = 0
+        batcher = CommitBatcher(conn)
         curr = start_local
         while curr <= end_local:
             query_url = build_url(curr)
-            data = fetch_with_retry(query_url)
-
-            if data and "features" in data:
-                logger.info(f"{curr.date()} → {len(data['features'])} records")
-
-                # === Save raw API response to disk ===
-                year = curr.strftime("%Y")
-                month = curr.strftime("%m")
-                day = curr.strftime("%d")
-                out_dir = os.path.join("data", "raw", f"year={year}", f"month={month}", f"day={day}")
-                os.makedirs(out_dir, exist_ok=True)
-                out_path = os.path.join(out_dir, "incidents.json")
-                with open(out_path, "w") as f_out:
-                    json.dump(data, f_out)
-
-                # === Upsert into DB ===                
-                rows = upsert_raw_incidents(conn, data["features"])
-                total_rows += rows
-                conn.commit()
+            body = fetch_with_retry(query_url)
+
+            if body and b'"features"' in body:
+                # === Upsert into DB (features parsed one at a time) ===
+                # A savepoint keeps each day all-or-nothing if the body turns
+                # out to be malformed part-way through.
+                with conn.cursor() as cur:
+                    cur.execute("SAVEPOINT tps_day")
+                try:
+                    rows = upsert_raw_incidents(conn, iter_features(body))
+                except ValueError as ve:  # includes json.JSONDecodeError
+                    with conn.cursor() as cur:
+                        cur.execute("ROLLBACK TO SAVEPOINT tps_day")
+                    logger.warning(f"{curr.date()} → malformed response, skipping ({ve})")
+                    rows = None
+                # Release so savepoints don't nest across the days in one commit batch
+                with conn.cursor() as cur:
+                    cur.execute("RELEASE SAVEPOINT tps_day")
+
+                if rows is not None:
+                    logger.info(f"{curr.date()} → {rows} records")
+                    total_rows += rows
+                    batcher.add(rows)
+
+                    # === Save raw API response to disk (bytes as received) ===
+                    year = curr.strftime("%Y")
+                    month = curr.strftime("%m")
+                    day = curr.strftime("%d")
+                    out_dir = os.path.join("data", "raw", f"year={year}", f"month={month}", f"day={day}")
+                    os.makedirs(out_dir, exist_ok=True)
+                    out_path = os.path.join(out_dir, "incidents.json")
+                    with open(out_path, "wb") as f_out:
+                        f_out.write(body)
             else:
                 logger.warning(f"{curr.date()} → no data")
 
             time.sleep(SLEEP_BETWEEN_CALLS)
             curr += timedelta(days=1)
 
+        batcher.flush()
+
         # Mark run as success
         log_run_end(conn, run_id, "success", row_count=total_rows)
 
@@ -262,7 +341,8 @@ def main():
         raise
     finally:
         if conn:
-            conn.close()
+            release_conn(conn)
+        close_pool()
 
 
 # Entry Point
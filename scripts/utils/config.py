@@ -0,0 +1,40 @@
+import os
+import sys
+import logging
+
+_env_loaded = False
+
+
+def load_env(path: str = ".env"):
+    """
+    Load DB/API settings from a .env file into os.environ, once per process.
+    Variables already set in the environment win. Skipped quietly when
+    python-dotenv isn't installed or the file doesn't exist.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    _env_loaded = True
+
+    if not os.path.exists(path):
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(path, override=False)
+
+
+def getenv(name: str, default=None):
+    """os.getenv() after load_env(), so .env values apply however the script was started."""
+    load_env()
+    return os.getenv(name, default)
+
+
+def setup_logging(level=logging.INFO):
+    """Configure root logging for CLI runs (no-op if already configured)."""
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s %(levelname)s %(message)s",
+        handlers=[logging.StreamHandler(sys.stdout)],
+    )
@@ -0,0 +1,132 @@
+import logging
+import threading
+import weakref
+
+import psycopg2
+import psycopg2.pool
+
+from scripts.utils.config import getenv
+
+logger = logging.getLogger(__name__)
+
+# ========================
+# CONFIG
+# ========================
+# Settings are read from the environment (and .env) when a connection is
+# made, not at import, so importing this module has no side effects.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Server-side prepared statement names, tracked per live connection
+_prepared = weakref.WeakKeyDictionary()
+
+
+def _conn_params():
+    return dict(
+        dbname=getenv("DB_NAME", "weather_accident_db"),
+        user=getenv("DB_USER", "postgres"),
+        password=getenv("DB_PASSWORD", "postgres"),
+        host=getenv("DB_HOST", "localhost"),
+        port=int(getenv("DB_PORT", 5432)),
+    )
+
+
+def get_db_conn():
+    """Open a standalone (unpooled) connection."""
+    return psycopg2.connect(**_conn_params())
+
+
+# ========================
+# Connection Pool
+# ========================
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            # ThreadedConnectionPool is safe to share between worker threads
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                int(getenv("DB_POOL_MIN", 1)), int(getenv("DB_POOL_MAX", 4)), **_conn_params()
+            )
+    return _pool
+
+
+def close_pool():
+    """Close every pooled connection. The next get_pool() starts a fresh pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+
+
+def configure_session(conn, bulk_load: bool = False):
+    """
+    Apply per-session settings. Bulk-load runs turn off synchronous_commit so
+    each commit doesn't wait on the WAL flush; a crash can lose the last few
+    commits but never corrupts data, and every ingest is an idempotent upsert.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SET TIME ZONE 'UTC'")
+        cur.execute("SET synchronous_commit TO %s", ("off" if bulk_load else "on",))
+    conn.commit()
+
+
+def acquire_conn(bulk_load: bool = False):
+    """Check a connection out of the pool with session options applied."""
+    conn = get_pool().getconn()
+    configure_session(conn, bulk_load=bulk_load)
+    return conn
+
+
+def release_conn(conn):
+    """Return a connection to the pool (rolls back any open transaction)."""
+    pool = _pool
+    if pool is None or pool.closed:
+        conn.close()
+        return
+    pool.putconn(conn)
+
+
+# ========================
+# Prepared Statements
+# ========================
+def execute_prepared(cur, name: str, sql: str, params: tuple):
+    """
+    Run `sql` (written with $1..$n placeholders) as a server-side prepared
+    statement. PREPARE is sent once per connection; later calls only send
+    EXECUTE with the parameter values, so the server skips parse/plan per row.
+    """
+    prepared = _prepared.setdefault(cur.connection, set())
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        prepared.add(name)
+    placeholders = ", ".join(["%s"] * len(params))
+    cur.execute(f"EXECUTE {name} ({placeholders})", params)
+
+
+# ========================
+# Commit Batching
+# ========================
+class CommitBatcher:
+    """
+    Commit every `batch_size` rows instead of after each unit of work
+    (default: DB_COMMIT_BATCH_SIZE, 5000).
+    """
+
+    def __init__(self, conn, batch_size: int = None):
+        self.conn = conn
+        self.batch_size = batch_size or int(getenv("DB_COMMIT_BATCH_SIZE", 5000))
+        self.pending = 0
+
+    def add(self, rows: int):
+        self.pending += rows
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.conn.commit()
+        if self.pending:
+            logger.info(f"Committed {self.pending} rows")
+        self.pending = 0
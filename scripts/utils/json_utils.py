@@ -0,0 +1,67 @@
+import re
+import json
+
+try:
+    import orjson  # optional: faster codec, used when installed
+except ImportError:
+    orjson = None
+
+_decoder = json.JSONDecoder()
+_WS = re.compile(r"[ \t\n\r]*")
+
+
+def loads(data):
+    """Parse JSON from bytes or str, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj) -> str:
+    """Serialize to a JSON string, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+def _skip_ws(text: str, idx: int) -> int:
+    return _WS.match(text, idx).end()
+
+
+def iter_array_items(text: str, key: str):
+    """
+    Yield (item, raw_text) for each element of the top-level array `key`
+    in a JSON object document, one element at a time.
+
+    Other top-level values are skipped without being kept, so the full array
+    is never materialized. raw_text is the element's exact source slice and
+    can be stored as-is instead of re-serializing the parsed item.
+    """
+    idx = _skip_ws(text, 0)
+    if text[idx:idx + 1] != "{":
+        raise ValueError("Expected a JSON object at top level")
+    idx = _skip_ws(text, idx + 1)
+
+    while idx < len(text) and text[idx] != "}":
+        name, idx = _decoder.raw_decode(text, idx)
+        idx = _skip_ws(text, idx)
+        if text[idx:idx + 1] != ":":
+            raise ValueError(f"Expected ':' after key {name!r} at position {idx}")
+        idx = _skip_ws(text, idx + 1)
+
+        if name == key and text[idx:idx + 1] == "[":
+            idx = _skip_ws(text, idx + 1)
+            while text[idx:idx + 1] != "]":
+                start = idx
+                item, idx = _decoder.raw_decode(text, idx)
+                yield item, text[start:idx]
+                idx = _skip_ws(text, idx)
+                if text[idx:idx + 1] == ",":
+                    idx = _skip_ws(text, idx + 1)
+            return
+
+        # Not the array we want: parse past the value and drop it
+        _, idx = _decoder.raw_decode(text, idx)
+        idx = _skip_ws(text, idx)
+        if text[idx:idx + 1] == ",":
+            idx = _skip_ws(text, idx + 1)
@@ -1,22 +1,30 @@
 import sys
-from datetime import date
+import struct
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
 from scripts import build_weather_cache
 
 
 def test_upsert_weather_cache_inserts_expected_rows(mock_weather_response, mock_db):
     conn, cursor = mock_db
+    cursor.rowcount = 24  # rows the upsert reports as written
     lat, lon = 43.61, -79.56
     rows = build_weather_cache.upsert_weather_cache(conn, lat, lon, mock_weather_response)
     assert rows == 24  # 24 hourly rows expected
-    assert cursor.execute.call_count == 24
-    # Check one row's SQL arguments
-    args, kwargs = cursor.execute.call_args_list[0]
-    assert round(args[1][0], 2) == round(lat, 2)
-    assert round(args[1][1], 2) == round(lon, 2)
+    # Stage table, one binary COPY, then one PREPARE/EXECUTE for the whole cell
+    assert cursor.copy_expert.call_count == 1
+    assert cursor.execute.call_count == 3
+    assert "CREATE TEMP TABLE IF NOT EXISTS weather_stage" in cursor.execute.call_args_list[0][0][0]
+    assert cursor.execute.call_args_list[1][0][0].startswith("PREPARE upsert_weather_cache")
+    args, kwargs = cursor.execute.call_args_list[2]
+    assert args[0].startswith("EXECUTE upsert_weather_cache")
+    assert args[1][0] == round(lat, 2)
+    assert args[1][1] == round(lon, 2)
 
 
 def test_cli_force_mode_runs(monkeypatch, mock_db, mock_weather_response):
     conn, cursor = mock_db
+    cursor.rowcount = 24
 
     # Patch DB connection
     monkeypatch.setattr(build_weather_cache.psycopg2, "connect", lambda **_: conn)
@@ -36,13 +44,18 @@ def test_cli_force_mode_runs(monkeypatch, mock_db, mock_weather_response):
     ]
     build_weather_cache.main()
 
-    # Should insert 24 rows
+    # Should load the 24 rows in one COPY + upsert
     insert_calls = [
         call_args[0][0]
         for call_args in cursor.execute.call_args_list
-        if "INSERT INTO weather_cache" in call_args[0][0]
+        if call_args[0][0].startswith("EXECUTE upsert_weather_cache")
     ]
-    assert len(insert_calls) == 24
+    assert len(insert_calls) == 1
+    assert cursor.copy_expert.call_count == 1
+    # Force mode overwrites final rows: no is_final guard
+    assert insert_calls[0].startswith("EXECUTE upsert_weather_cache_force")
+    prepared = [c[0][0] for c in cursor.execute.call_args_list if c[0][0].startswith("PREPARE")]
+    assert "WHERE NOT weather_cache.is_final" not in prepared[0]
     # Commit should be called at least once
     assert conn.commit.call_count >= 1
 
@@ -50,6 +63,7 @@ def test_cli_force_mode_runs(monkeypatch, mock_db, mock_weather_response):
 
 def test_bulk_mode_runs(monkeypatch, mock_db, mock_weather_response):
     conn, cursor = mock_db
+    cursor.rowcount = 24
 
     # Patch DB connection
     monkeypatch.setattr(build_weather_cache.psycopg2, "connect", lambda **_: conn)
@@ -57,6 +71,7 @@ def test_bulk_mode_runs(monkeypatch, mock_db, mock_weather_response):
     monkeypatch.setattr(build_weather_cache, "fetch_with_retry", lambda url: mock_weather_response)
     # Patch find_missing_ranges to return one triple
     monkeypatch.setattr(build_weather_cache, "find_missing_ranges", lambda conn: [(43.61, -79.56, date(2024, 1, 1), date(2024, 1, 1))])
+    monkeypatch.setattr(build_weather_cache, "find_provisional_ranges", lambda conn: [])
     # Patch logging
     monkeypatch.setattr(build_weather_cache.logger, "info", lambda *a, **kw: None)
     monkeypatch.setattr(build_weather_cache.logger, "warning", lambda *a, **kw: None)
@@ -65,11 +80,168 @@ def test_bulk_mode_runs(monkeypatch, mock_db, mock_weather_response):
     sys.argv = ["build_weather_cache.py", "--triggered-by", "test"]
     build_weather_cache.main()
 
-    # Should insert 24 rows for the one missing triple
+    # Should load the 24 rows for the one missing triple in one COPY + upsert
     insert_calls = [
         call_args[0][0]
         for call_args in cursor.execute.call_args_list
-        if "INSERT INTO weather_cache" in call_args[0][0]
+        if call_args[0][0].startswith("EXECUTE upsert_weather_cache")
     ]
-    assert len(insert_calls) == 24
+    assert len(insert_calls) == 1
+    assert cursor.copy_expert.call_count == 1
+    assert insert_calls[0].startswith("EXECUTE upsert_weather_cache ")
     assert conn.commit.call_count >= 1
+
+
+def test_to_hourly_arrays_types_and_nulls(mock_weather_response):
+    hourly = mock_weather_response["hourly"]
+    hourly["temperature_2m"][1] = None
+    hourly["weathercode"][2] = None
+    hourly["time"][3] = "not-a-time"
+
+    arrays = build_weather_cache.to_hourly_arrays(mock_weather_response)
+
+    assert arrays["hour_epoch"].dtype == np.int64
+    assert arrays["temperature"].dtype == np.float32
+    assert arrays["weathercode"].dtype == np.int16
+    # Malformed timestamp row dropped
+    assert len(arrays["hour_epoch"]) == 23
+    assert arrays["hour_epoch"][0] == int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp())
+    assert np.isnan(arrays["temperature"][1])
+    assert arrays["weathercode"][2] == build_weather_cache.WEATHERCODE_NULL
+
+
+def test_to_hourly_arrays_accepts_unixtime(mock_weather_response):
+    hourly = mock_weather_response["hourly"]
+    hourly["time"] = [1704067200 + 3600 * h for h in range(24)]
+    arrays = build_weather_cache.to_hourly_arrays(mock_weather_response)
+    assert arrays["hour_epoch"].tolist() == hourly["time"]
+
+
+def test_to_hourly_arrays_drops_null_unixtime(mock_weather_response):
+    hourly = mock_weather_response["hourly"]
+    hourly["time"] = [1704067200 + 3600 * h for h in range(24)]
+    hourly["time"][5] = None
+    hourly["temperature_2m"][6] = -3.5
+
+    arrays = build_weather_cache.to_hourly_arrays(mock_weather_response)
+
+    assert len(arrays["hour_epoch"]) == 23
+    assert 1704067200 + 3600 * 5 not in arrays["hour_epoch"].tolist()
+    assert arrays["temperature"][5] == np.float32(-3.5)  # rows stay aligned
+
+
+def test_upsert_skips_mismatched_column_lengths(mock_weather_response, mock_db):
+    conn, cursor = mock_db
+    cursor.rowcount = 24
+    mock_weather_response["hourly"]["windspeed_10m"].pop()
+
+    rows = build_weather_cache.upsert_weather_cache(conn, 43.61, -79.56, mock_weather_response)
+
+    assert rows == 0
+    cursor.execute.assert_not_called()
+
+
+def test_copy_buffer_packs_binary_rows(mock_weather_response):
+    hourly = mock_weather_response["hourly"]
+    hourly["temperature_2m"][0] = None
+    hourly["weathercode"][0] = None
+    arrays = build_weather_cache.to_hourly_arrays(mock_weather_response)
+
+    payload = build_weather_cache._copy_buffer(arrays).getvalue()
+
+    header = build_weather_cache.COPY_HEADER
+    assert payload.startswith(header)
+    assert payload.endswith(build_weather_cache.COPY_TRAILER)
+    # int16 field count, then (int32 length, value) per column
+    record_size = 2 + (4 + 8) + 6 * (4 + 4) + (4 + 2)
+    assert len(payload) == len(header) + 24 * record_size + 2
+    nfields, _, hour, _, temperature = struct.unpack_from("!hiqif", payload, len(header))
+    assert nfields == 8
+    assert hour == 1704067200          # epoch seconds, converted by to_timestamp()
+    assert np.isnan(temperature)       # NULLIF(..., 'NaN') in the upsert
+    weathercode = struct.unpack_from("!h", payload, len(header) + 2 + 12 + 3 * 8 + 4)[0]
+    assert weathercode == build_weather_cache.WEATHERCODE_NULL
+
+
+def test_upsert_passes_final_cutoff(mock_weather_response, mock_db):
+    conn, cursor = mock_db
+    cursor.rowcount = 24
+
+    build_weather_cache.upsert_weather_cache(conn, 43.61, -79.56, mock_weather_response)
+
+    args, _ = cursor.execute.call_args_list[-1]
+    # Staged hours before the cutoff are written with is_final = true
+    assert args[1][2] == build_weather_cache._final_cutoff_epoch()
+
+
+def test_upsert_returns_rows_actually_written(mock_weather_response, mock_db):
+    conn, cursor = mock_db
+    cursor.rowcount = 10  # 14 of 24 hours were already final and skipped
+
+    rows = build_weather_cache.upsert_weather_cache(conn, 43.61, -79.56, mock_weather_response)
+
+    assert rows == 10
+
+
+def test_final_cutoff_date_uses_archive_lag():
+    lag = build_weather_cache.archive_lag_days()
+    assert build_weather_cache.final_cutoff_date(date(2024, 3, 20)) == date(2024, 3, 20) - timedelta(days=lag)
+
+
+def test_bulk_mode_refetches_provisional_ranges(monkeypatch, mock_db, mock_weather_response):
+    conn, cursor = mock_db
+    cursor.rowcount = 24
+    fetched = []
+
+    monkeypatch.setattr(build_weather_cache.psycopg2, "connect", lambda **_: conn)
+    monkeypatch.setattr(build_weather_cache, "fetch_with_retry", lambda url: fetched.append(url) or mock_weather_response)
+    monkeypatch.setattr(build_weather_cache, "find_missing_ranges", lambda conn: [])
+    monkeypatch.setattr(
+        build_weather_cache,
+        "find_provisional_ranges",
+        lambda conn: [(43.61, -79.56, date(2024, 1, 1), date(2024, 1, 1))],
+    )
+    monkeypatch.setattr(build_weather_cache.time, "sleep", lambda s: None)
+
+    build_weather_cache.main(["--triggered-by", "test"])
+
+    assert len(fetched) == 1
+    assert "start_date=2024-01-01" in fetched[0]
+
+
+def test_merge_ranges_dedupes_overlapping_days_per_cell():
+    ranges = [
+        (43.61, -79.56, date(2024, 1, 8), date(2024, 1, 12)),   # missing
+        (43.61, -79.56, date(2024, 1, 10), date(2024, 1, 10)),  # provisional, inside it
+        (43.61, -79.56, date(2024, 1, 13), date(2024, 1, 14)),  # adjacent
+        (43.62, -79.56, date(2024, 1, 10), date(2024, 1, 10)),  # other cell
+    ]
+    assert build_weather_cache.merge_ranges(ranges) == [
+        (43.61, -79.56, date(2024, 1, 8), date(2024, 1, 14)),
+        (43.62, -79.56, date(2024, 1, 10), date(2024, 1, 10)),
+    ]
+
+
+def test_bulk_mode_fetches_overlapping_day_once(monkeypatch, mock_db, mock_weather_response):
+    conn, cursor = mock_db
+    cursor.rowcount = 24
+    fetched = []
+
+    monkeypatch.setattr(build_weather_cache.psycopg2, "connect", lambda **_: conn)
+    monkeypatch.setattr(build_weather_cache, "fetch_with_retry", lambda url: fetched.append(url) or mock_weather_response)
+    monkeypatch.setattr(
+        build_weather_cache,
+        "find_missing_ranges",
+        lambda conn: [(43.61, -79.56, date(2024, 1, 8), date(2024, 1, 12))],
+    )
+    monkeypatch.setattr(
+        build_weather_cache,
+        "find_provisional_ranges",
+        lambda conn: [(43.61, -79.56, date(2024, 1, 10), date(2024, 1, 10))],
+    )
+    monkeypatch.setattr(build_weather_cache.time, "sleep", lambda s: None)
+
+    build_weather_cache.main(["--triggered-by", "test"])
+
+    assert len(fetched) == 1
+    assert "start_date=2024-01-08" in fetched[0] and "end_date=2024-01-12" in fetched[0]
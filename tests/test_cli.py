@@ -0,0 +1,66 @@
+import sys
+import shutil
+import subprocess
+import pytest
+from types import SimpleNamespace
+from scripts import cli
+
+
+def test_cli_import_is_lazy():
+    """Importing the CLI must not pull in any subcommand's heavy dependencies."""
+    code = (
+        "import sys, scripts.cli; "
+        "print(','.join(m for m in ('pandas', 'numpy', 'requests', 'psycopg2') if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_subcommand_args_are_passed_through(monkeypatch):
+    calls = []
+    fake = SimpleNamespace(main=lambda argv: calls.append(argv))
+    monkeypatch.setattr(cli, "import_subcommand", lambda name: (fake, 0.0, 0))
+
+    cli.main(["weather", "--lat", "43.61", "--lon", "-79.56", "--date", "2024-01-01"])
+    assert calls == [["--lat", "43.61", "--lon", "-79.56", "--date", "2024-01-01"]]
+
+
+def test_run_executes_pipeline_in_order(monkeypatch):
+    calls = []
+
+    def fake_import(name):
+        return SimpleNamespace(main=lambda argv: calls.append((name, argv))), 0.0, 0
+
+    monkeypatch.setattr(cli, "import_subcommand", fake_import)
+    monkeypatch.setattr(cli.subprocess, "run", lambda cmd, check: calls.append(("dbt", cmd[:2])))
+    cli.main(["run", "--triggered-by", "cron"])
+    assert calls == [
+        ("ingest", ["--triggered-by", "cron"]),
+        ("weather", ["--triggered-by", "cron"]),
+        ("dbt", ["dbt", "build"]),
+        ("export", ["--triggered-by", "cron"]),
+    ]
+
+
+def test_run_stops_before_export_when_dbt_build_fails(monkeypatch):
+    calls = []
+
+    def fake_import(name):
+        return SimpleNamespace(main=lambda argv: calls.append(name)), 0.0, 0
+
+    def failing_dbt(cmd, check):
+        raise subprocess.CalledProcessError(1, cmd)
+
+    monkeypatch.setattr(cli, "import_subcommand", fake_import)
+    monkeypatch.setattr(cli.subprocess, "run", failing_dbt)
+    with pytest.raises(subprocess.CalledProcessError):
+        cli.main(["run"])
+    assert calls == ["ingest", "weather"]
+
+
+def test_wap_console_script_is_installed():
+    wap = shutil.which("wap")
+    if wap is None:
+        pytest.skip("project not installed (uv sync or pip install -e .)")
+    out = subprocess.run([wap, "--help"], capture_output=True, text=True, check=True)
+    assert "{ingest,weather,export,run}" in out.stdout
@@ -0,0 +1,64 @@
+import sys
+import subprocess
+from scripts.utils import db_utils
+
+
+def test_execute_prepared_prepares_once_per_connection(mock_db):
+    conn, cursor = mock_db
+    sql = "INSERT INTO t (a, b) VALUES ($1, $2)"
+    db_utils.execute_prepared(cursor, "ins_t", sql, (1, 2))
+    db_utils.execute_prepared(cursor, "ins_t", sql, (3, 4))
+
+    statements = [c[0][0] for c in cursor.execute.call_args_list]
+    assert statements == [
+        f"PREPARE ins_t AS {sql}",
+        "EXECUTE ins_t (%s, %s)",
+        "EXECUTE ins_t (%s, %s)",
+    ]
+    assert cursor.execute.call_args_list[-1][0][1] == (3, 4)
+
+
+def test_configure_session_bulk_load_disables_synchronous_commit(mock_db):
+    conn, cursor = mock_db
+    db_utils.configure_session(conn, bulk_load=True)
+    assert ("SET synchronous_commit TO %s", ("off",)) in [c[0] for c in cursor.execute.call_args_list]
+    assert conn.commit.call_count == 1
+
+
+def test_commit_batcher_commits_on_threshold(mock_db):
+    conn, _ = mock_db
+    batcher = db_utils.CommitBatcher(conn, batch_size=10)
+    batcher.add(4)
+    assert conn.commit.call_count == 0
+    batcher.add(7)
+    assert conn.commit.call_count == 1
+    assert batcher.pending == 0
+    batcher.add(2)
+    batcher.flush()
+    assert conn.commit.call_count == 2
+
+
+def test_pool_hands_out_and_reclaims_connections(monkeypatch, mock_db):
+    conn, _ = mock_db
+    monkeypatch.setattr(db_utils.psycopg2, "connect", lambda **_: conn)
+    try:
+        acquired = db_utils.acquire_conn(bulk_load=True)
+        assert acquired is conn
+        db_utils.release_conn(acquired)
+    finally:
+        db_utils.close_pool()
+    assert db_utils._pool is None
+
+
+def test_conn_params_read_environment_at_call_time(monkeypatch):
+    monkeypatch.setenv("DB_HOST", "db.internal")
+    monkeypatch.setenv("DB_PORT", "6543")
+    params = db_utils._conn_params()
+    assert params["host"] == "db.internal"
+    assert params["port"] == 6543
+
+
+def test_import_does_not_load_env():
+    code = "import scripts.utils.db_utils, scripts.utils.config as c; print(c._env_loaded)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
@@ -1,6 +1,6 @@
 import os
 import pandas as pd
-from scripts.fetch_tps_incidents import get_db_conn
+from scripts.utils.db_utils import get_db_conn
 from scripts.export_for_tableau import export_for_tableau
 
 def test_export_for_tableau_basic(tmp_path):
@@ -23,3 +23,31 @@ def test_export_for_tableau_basic(tmp_path):
     df = pd.read_csv(output_path)
     assert "event_id" in df.columns, "event_id missing in export"
     assert len(df) > 0, "Exported file is empty"
+
+
+def test_export_for_tableau_rollups(monkeypatch, tmp_path, mock_db):
+    """Rollup mode writes one CSV per agg_* table next to the flat export path."""
+    from scripts import export_for_tableau as module
+
+    conn, cursor = mock_db
+    cursor.fetchone.return_value = (None,)
+    monkeypatch.setattr(module, "acquire_conn", lambda: conn)
+    monkeypatch.setattr(module, "release_conn", lambda c: None)
+
+    queries = []
+
+    def fake_read_sql_query(query, _conn):
+        queries.append(query)
+        return pd.DataFrame({"occ_date_day": ["2024-01-01"], "incident_count": [3]})
+
+    monkeypatch.setattr(module.pd, "read_sql_query", fake_read_sql_query)
+
+    output_path = tmp_path / "incidents.csv"
+    output_path.write_text("event_id\n" + "GO-1\n" * 100)
+    export_for_tableau(str(output_path), triggered_by="pytest", rollups=True)
+
+    assert queries == [f"SELECT * FROM {t};" for t in module.ROLLUP_TABLES]
+    assert (tmp_path / "agg_incidents_daily.csv").exists()
+    assert (tmp_path / "agg_weather_exposure_hourly.csv").exists()
+    # Flat export untouched
+    assert output_path.read_text().startswith("event_id\n")
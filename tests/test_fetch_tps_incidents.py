@@ -1,4 +1,6 @@
 import sys
+import json
+from unittest.mock import MagicMock
 from scripts import fetch_tps_incidents
 from datetime import datetime, timedelta
 import pytz
@@ -9,9 +11,11 @@ def test_upsert_raw_incidents_inserts_expected_rows(mock_tps_response, mock_db):
     rows = fetch_tps_incidents.upsert_raw_incidents(conn, mock_tps_response["features"])
     # We have 3 incidents in the fixture
     assert rows == 3
-    assert cursor.execute.call_count == 3
+    # One PREPARE, then one EXECUTE per row
+    assert cursor.execute.call_count == 4
+    assert cursor.execute.call_args_list[0][0][0].startswith("PREPARE upsert_raw_incident")
     # Check one row's SQL arguments
-    args, kwargs = cursor.execute.call_args_list[0]
+    args, kwargs = cursor.execute.call_args_list[1]
     assert args[1][0] is not None  # objectid
     assert args[1][4] is not None  # lat
     assert args[1][5] is not None  # lon
@@ -20,7 +24,8 @@ def test_upsert_raw_incidents_inserts_expected_rows(mock_tps_response, mock_db):
 def test_upsert_raw_incidents_handles_missing_latlon(mock_db):
     conn, cursor = mock_db
     features = [
-        {"attributes": {"OBJECTID": 99, "EVENT_UNIQUE_ID":"GO-20240000099", "LAT_WGS84": 0, "LONG_WGS84": 0}, "geometry": {"x": None, "y": None}}
+        {"attributes": {"OBJECTID": 99, "EVENT_UNIQUE_ID":"GO-20240000099", "OCC_DATE": 1704085200000,
+                        "LAT_WGS84": 0, "LONG_WGS84": 0}, "geometry": {"x": None, "y": None}}
     ]
     rows = fetch_tps_incidents.upsert_raw_incidents(conn, features)
     assert rows == 1
@@ -31,14 +36,37 @@ def test_upsert_raw_incidents_handles_missing_latlon(mock_db):
     assert args[1][5] is None  # lon
 
 
-def test_cli_entrypoint_runs(monkeypatch, mock_db, mock_tps_response):
+def test_upsert_raw_incidents_revised_occ_hour_replaces_row(mock_db):
+    conn, cursor = mock_db
+    feature = {"attributes": {"OBJECTID": 7, "EVENT_UNIQUE_ID": "GO-20240000007", "OCC_DATE": 1704085200000,
+                              "OCC_HOUR": 3, "LAT_WGS84": 43.65, "LONG_WGS84": -79.38}}
+    fetch_tps_incidents.upsert_raw_incidents(conn, [feature])
+    feature["attributes"]["OCC_HOUR"] = 23  # TPS revises the occurrence hour
+    fetch_tps_incidents.upsert_raw_incidents(conn, [feature])
+
+    prepare = cursor.execute.call_args_list[0][0][0]
+    # The old row is found through raw_incident_keys and removed in the same statement,
+    # bounded to its own partition
+    assert "FROM raw_incident_keys WHERE event_id = $1" in prepare
+    assert "DELETE FROM raw_incidents" in prepare
+    assert "occ_date_utc = (SELECT occ_date_utc FROM prev)" in prepare
+    assert "INSERT INTO raw_incident_keys" in prepare
+    executes = [c[0][1] for c in cursor.execute.call_args_list if c[0][0].startswith("EXECUTE")]
+    assert [p[0] for p in executes] == ["GO-20240000007", "GO-20240000007"]
+    assert executes[1][3] - executes[0][3] == timedelta(hours=20)
+
+
+def test_cli_entrypoint_runs(monkeypatch, tmp_path, mock_db, mock_tps_response):
     conn, cursor = mock_db
 
     # Mock DB connection
     monkeypatch.setattr(fetch_tps_incidents.psycopg2, "connect", lambda **_: conn)
 
-    # Mock fetch_with_retry to return the fixed mock response
-    monkeypatch.setattr(fetch_tps_incidents, "fetch_with_retry", lambda url: mock_tps_response)
+    # Mock fetch_with_retry to return the fixed mock response body
+    body = json.dumps(mock_tps_response).encode("utf-8")
+    monkeypatch.setattr(fetch_tps_incidents, "fetch_with_retry", lambda url: body)
+    # Keep the raw archive out of the working tree
+    monkeypatch.chdir(tmp_path)
 
     # Mock logging to suppress output
     monkeypatch.setattr(fetch_tps_incidents.logger, "info", lambda *args, **kwargs: None)
@@ -57,9 +85,98 @@ def test_cli_entrypoint_runs(monkeypatch, mock_db, mock_tps_response):
     insert_calls = [
         call_args[0][0]
         for call_args in cursor.execute.call_args_list
-        if "INSERT INTO raw_incidents" in call_args[0][0]
+        if call_args[0][0].startswith("EXECUTE upsert_raw_incident")
     ]
     assert len(insert_calls) == 3
 
     # conn.commit should be called at least once
     assert conn.commit.call_count >= 1
+
+    # Monthly partitions for the load window are ensured before inserting
+    partition_calls = [
+        call_args[0][1][0]
+        for call_args in cursor.execute.call_args_list
+        if "ensure_raw_incidents_partition" in call_args[0][0]
+    ]
+    assert [(m.year, m.month) for m in partition_calls] == [(2024, 1)]
+
+    # Raw body is archived byte-for-byte
+    archive = tmp_path / "data" / "raw" / "year=2024" / "month=01" / "day=01" / "incidents.json"
+    assert archive.read_bytes() == body
+
+
+def test_iter_features_yields_raw_slices(mock_tps_response):
+    payload = {"objectIdFieldName": "OBJECTID", "fields": [{"name": "OBJECTID"}], **mock_tps_response,
+               "exceededTransferLimit": False}
+    body = json.dumps(payload, indent=2).encode("utf-8")
+
+    items = list(fetch_tps_incidents.iter_features(body))
+    assert [f for f, _ in items] == mock_tps_response["features"]
+    for f, raw in items:
+        assert json.loads(raw) == f
+
+
+def test_upsert_raw_incidents_reuses_raw_json(mock_tps_response, mock_db):
+    conn, cursor = mock_db
+    body = json.dumps(mock_tps_response).encode("utf-8")
+    rows = fetch_tps_incidents.upsert_raw_incidents(conn, fetch_tps_incidents.iter_features(body))
+    assert rows == 3
+    args, kwargs = cursor.execute.call_args_list[1]
+    # JSONB parameter is the feature's original text, not a re-serialization
+    assert args[1][2] in body.decode("utf-8")
+
+
+def test_upsert_raw_incidents_skips_missing_occ_date(mock_db):
+    conn, cursor = mock_db
+    features = [{"attributes": {"OBJECTID": 7, "EVENT_UNIQUE_ID": "GO-7", "LAT_WGS84": 43.6, "LONG_WGS84": -79.4}}]
+    rows = fetch_tps_incidents.upsert_raw_incidents(conn, features)
+    assert rows == 0
+    assert cursor.execute.call_count == 0
+
+
+def test_fetch_with_retry_retries_truncated_body(monkeypatch):
+    import requests
+
+    bodies = [b'{"features":[{"a":1},{"a":', b'{"features": []}']
+    calls = []
+
+    def fake_get(url, timeout):
+        calls.append(url)
+        response = MagicMock()
+        response.content = bodies[len(calls) - 1]
+        return response
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    monkeypatch.setattr(fetch_tps_incidents.time, "sleep", lambda s: None)
+
+    assert fetch_tps_incidents.fetch_with_retry("http://example") == b'{"features": []}'
+    assert len(calls) == 2
+
+
+def test_cli_skips_day_with_malformed_body(monkeypatch, tmp_path, mock_db, mock_tps_response):
+    conn, cursor = mock_db
+    good = json.dumps(mock_tps_response).encode("utf-8")
+    # Passes the structural check but is broken inside the features array
+    bad = b'{"features": [' + json.dumps(mock_tps_response["features"][0]).encode("utf-8") + b', {"a": }]}'
+    bodies = iter([bad, good])
+
+    monkeypatch.setattr(fetch_tps_incidents.psycopg2, "connect", lambda **_: conn)
+    monkeypatch.setattr(fetch_tps_incidents, "fetch_with_retry", lambda url: next(bodies))
+    monkeypatch.setattr(fetch_tps_incidents.time, "sleep", lambda s: None)
+    monkeypatch.chdir(tmp_path)
+
+    fetch_tps_incidents.main([
+        "--start-date", "2024-01-01",
+        "--end-date", "2024-01-02",
+        "--triggered-by", "test",
+    ])
+
+    statements = [c[0][0] for c in cursor.execute.call_args_list]
+    assert "ROLLBACK TO SAVEPOINT tps_day" in statements
+    # Every day's savepoint is released, good or bad
+    assert statements.count("SAVEPOINT tps_day") == statements.count("RELEASE SAVEPOINT tps_day") == 2
+    # Bad day rolled back and not archived; next day still loaded
+    assert not (tmp_path / "data" / "raw" / "year=2024" / "month=01" / "day=01").exists()
+    assert (tmp_path / "data" / "raw" / "year=2024" / "month=01" / "day=02" / "incidents.json").read_bytes() == good
+    # 1 row attempted before the bad feature (rolled back) + 3 from the good day
+    assert sum(s.startswith("EXECUTE upsert_raw_incident") for s in statements) == 4